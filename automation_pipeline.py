@@ -5,10 +5,14 @@
 import pandas as pd
 import os
 import time
+import contextlib
+import data_collection
 from data_collection import collect_data
 from data_cleaning import clean_data
 from feature_engineering import engineer_features
 from predictive_modeling import predictive_modeling
+from feature_store import update_feature_store
+from config import EXECUTION_BACKEND, MODEL_TRAINING_MODE, DATA_UPDATE_THRESHOLD
 
 # Define paths for the processed data and model
 PROCESSED_DATA_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/processed_data.csv"
@@ -17,56 +21,104 @@ MODEL_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/model.pkl"
 # Function to check if new data is available
 def check_for_new_data():
     """
-    Checks if new data files are available by monitoring the data directory.
+    Checks if new data is available: new or changed CSV drops that have not been ingested yet, or a SQL database
+    updated within DATA_UPDATE_THRESHOLD seconds. In WAL mode new rows land in the "-wal" file before they are
+    checkpointed into the database file, so its modification time is checked too.
     
     Returns:
     bool: True if new data is available, False otherwise.
     """
-    # For simplicity, we check if the 'vehicle_data.db' file has been updated (you can modify this logic as needed)
-    data_directory = "C:/Users/Satej/Documents/Vehicle_Telematics/"
-    file_timestamp = os.path.getmtime(data_directory + "vehicle_data.db")
-    
-    current_time = time.time()
-    if current_time - file_timestamp < 86400:  # 1 day in seconds (you can modify this threshold)
+    if data_collection.find_new_csv_files():
         return True
-    return False
+    
+    db_path = data_collection.SQL_DATABASE_PATH
+    timestamps = [os.path.getmtime(path) for path in (db_path, db_path + "-wal") if os.path.exists(path)]
+    return bool(timestamps) and time.time() - max(timestamps) < DATA_UPDATE_THRESHOLD
 
-# Function to automate the entire pipeline
-def automate_pipeline():
+# Function to train the predictive model and save it
+def train_and_save_model():
     """
-    Automates the data ingestion, cleaning, feature engineering, and model prediction pipeline.
-    Ensures that the processed data and predictive model are up-to-date.
+    Trains and evaluates the predictive model on the engineered data and saves it for later use.
+    In "incremental" mode the model is trained from streamed chunks with fixed memory.
     """
-    if check_for_new_data():
-        print("New data available. Starting pipeline...")
-        
+    if MODEL_TRAINING_MODE == "incremental":
+        from incremental_modeling import incremental_modeling
+        model = incremental_modeling()
+    else:
+        model = predictive_modeling()
+    
+    # Keep the last saved model when there was no data to train on or training failed
+    if model is None:
+        print("No model was trained; keeping the previously saved model.")
+        return
+    print("Model trained and evaluated successfully.")
+    
+    # Save the model for later use
+    import joblib
+    joblib.dump(model, MODEL_PATH)
+    print(f"Model saved to {MODEL_PATH}")
+
+# Function to run the pipeline stages
+def run_pipeline(stage_timer=None):
+    """
+    Runs data collection, cleaning, feature engineering, and model training, saving each stage's output.
+    
+    Parameters:
+    stage_timer (callable): Optional function returning a context manager for a stage name, used to profile stages.
+    """
+    stage_timer = stage_timer or (lambda stage: contextlib.nullcontext())
+    
+    if EXECUTION_BACKEND == "duckdb":
+        # Steps 1-3: Collection, cleaning and feature engineering as one out-of-core DuckDB plan
+        with stage_timer("query_pipeline"):
+            import query_engine
+            query_engine.run_query_pipeline(PROCESSED_DATA_PATH)
+    elif EXECUTION_BACKEND == "distributed":
+        # Steps 1-3: Cleaning and feature engineering sharded over worker processes, then merged
+        with stage_timer("distributed_pipeline"):
+            import distributed_pipeline
+            if not distributed_pipeline.run_coordinator(processed_path=PROCESSED_DATA_PATH, retrain=False):
+                print("Distributed pipeline did not complete; skipping model training on stale data.")
+                return
+    else:
         # Step 1: Data Collection
-        collected_data = collect_data()
-        if not collected_data.empty:
-            collected_data.to_csv(PROCESSED_DATA_PATH, index=False)
-            print("Data collection completed and saved.")
+        with stage_timer("collection"):
+            collected_data = collect_data()
+            if not collected_data.empty:
+                collected_data.to_csv(PROCESSED_DATA_PATH, index=False)
+                print("Data collection completed and saved.")
         
         # Step 2: Data Cleaning
-        cleaned_data = clean_data()
-        if not cleaned_data.empty:
-            cleaned_data.to_csv(PROCESSED_DATA_PATH, index=False)
-            print("Data cleaning completed and saved.")
+        with stage_timer("cleaning"):
+            cleaned_data = clean_data()
+            if not cleaned_data.empty:
+                cleaned_data.to_csv(PROCESSED_DATA_PATH, index=False)
+                print("Data cleaning completed and saved.")
         
         # Step 3: Feature Engineering
-        engineered_data = engineer_features()
-        if not engineered_data.empty:
-            engineered_data.to_csv(PROCESSED_DATA_PATH, index=False)
-            print("Feature engineering completed and saved.")
-        
-        # Step 4: Predictive Modeling
-        model = predictive_modeling()
-        print("Model trained and evaluated successfully.")
-        
-        # Save the model for later use
-        import joblib
-        joblib.dump(model, MODEL_PATH)
-        print(f"Model saved to {MODEL_PATH}")
+        with stage_timer("feature_engineering"):
+            engineered_data = engineer_features()
+            if not engineered_data.empty:
+                engineered_data.to_csv(PROCESSED_DATA_PATH, index=False)
+                print("Feature engineering completed and saved.")
         
+        # Refresh the per-vehicle feature store with the latest features
+        with stage_timer("feature_store"):
+            update_feature_store(engineered_data)
+    
+    # Step 4: Predictive Modeling
+    with stage_timer("modeling"):
+        train_and_save_model()
+
+# Function to automate the entire pipeline
+def automate_pipeline():
+    """
+    Automates the data ingestion, cleaning, feature engineering, and model prediction pipeline.
+    Ensures that the processed data and predictive model are up-to-date.
+    """
+    if check_for_new_data():
+        print("New data available. Starting pipeline...")
+        run_pipeline()
     else:
         print("No new data available. Skipping pipeline.")
 
@@ -0,0 +1,395 @@
+# benchmark.py
+# This script benchmarks the automation pipeline end-to-end on synthetic fleets of increasing size.
+# For each scale it records throughput, peak memory and the wall time of every pipeline stage in a results file,
+# and compares them with a saved baseline so that performance regressions are caught before deployment.
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from synthetic_data import generate_fleet_dataset
+from config import (BENCHMARK_SCALES, BENCHMARK_SAMPLES_PER_DAY, BENCHMARK_TIME_TOLERANCE,
+                    BENCHMARK_MEMORY_TOLERANCE, EXECUTION_BACKEND, DEDUP_KEY_COLUMNS)
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; psutil is used there if it is installed
+    resource = None
+
+# Define paths for the benchmark data and results
+BENCHMARK_DIRECTORY = "C:/Users/Satej/Documents/Vehicle_Telematics/benchmarks"
+RESULTS_PATH = os.path.join(BENCHMARK_DIRECTORY, "benchmark_results.json")
+BASELINE_PATH = os.path.join(BENCHMARK_DIRECTORY, "benchmark_baseline_{backend}.json")  # One baseline per backend
+
+# Tolerance when comparing the outputs of different backends (summation order differs between engines); values
+# match when they are within this tolerance either absolutely or relative to their magnitude
+PARITY_TOLERANCE = 1e-5
+
+# Function to measure the peak resident memory of the current process or its worker processes
+def peak_memory_mb(children: bool = False):
+    """
+    Returns the peak resident set size of the current process in megabytes, or None if it cannot be measured.
+    
+    Parameters:
+    children (bool): Measure the largest of the terminated child processes (e.g. distributed workers) instead.
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    if children:
+        return None
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+# Function to point every pipeline module at the benchmark files
+def configure_pipeline_paths(data_dir: str, work_dir: str, backend: str, drop_dir: str = None):
+    """
+    Redirects the data and output paths of the pipeline modules to a benchmark dataset and working directory,
+    chaining the stages so that each one reads the output of the previous one.
+    
+    Parameters:
+    data_dir (str): The directory holding the synthetic database and CSV drops.
+    work_dir (str): The directory for the pipeline's outputs and state.
+    backend (str): The execution backend to use ("pandas", "duckdb" or "distributed").
+    drop_dir (str): The CSV drop directory to ingest from (defaults to the dataset's csv_drops directory).
+    """
+    import data_collection, deduplication, data_cleaning, feature_engineering, predictive_modeling
+    import dashboard_export, automation_pipeline, query_engine, distributed_pipeline, feature_store, incremental_modeling
+    
+    processed_path = os.path.join(work_dir, "processed_data.csv")
+    export_path = os.path.join(work_dir, "dashboard_export.csv")
+    
+    data_collection.SQL_DATABASE_PATH = os.path.join(data_dir, "vehicle_data.db")
+    data_collection.CSV_DROP_DIRECTORY = drop_dir or os.path.join(data_dir, "csv_drops")
+    data_collection.CSV_FILE_PATH = os.path.join(data_dir, "vehicle_performance_data.csv")
+    data_collection.CSV_MANIFEST_PATH = os.path.join(work_dir, "ingested_files.json")
+    data_collection.RAW_STORE_PATH = os.path.join(work_dir, "ingested_records.db")
+    deduplication.BLOOM_FILTER_PATH = os.path.join(work_dir, "dedup_bloom.npz")
+    for module in (data_cleaning, feature_engineering, predictive_modeling, incremental_modeling):
+        module.DATA_FILE_PATH = processed_path
+    incremental_modeling.CHECKPOINT_PATH = os.path.join(work_dir, "incremental_checkpoint.pkl")
+    incremental_modeling.REPORT_PATH = os.path.join(work_dir, "model_comparison.json")
+    automation_pipeline.PROCESSED_DATA_PATH = processed_path
+    automation_pipeline.MODEL_PATH = os.path.join(work_dir, "model.pkl")
+    dashboard_export.PROCESSED_DATA_PATH = processed_path
+    dashboard_export.EXPORT_FILE_PATH = export_path
+    query_engine.PROCESSED_DATA_PATH = processed_path
+    query_engine.EXPORT_FILE_PATH = export_path
+    query_engine.DUCKDB_TEMP_DIRECTORY = os.path.join(work_dir, "duckdb_tmp")
+    distributed_pipeline.WORK_QUEUE_DIRECTORY = os.path.join(work_dir, "work_queue")
+    distributed_pipeline.PROCESSED_DATA_PATH = processed_path
+    distributed_pipeline.EXPORT_FILE_PATH = export_path
+    feature_store.FEATURE_STORE_PATH = os.path.join(work_dir, "feature_store.db")
+    automation_pipeline.EXECUTION_BACKEND = backend
+    dashboard_export.EXECUTION_BACKEND = backend
+
+# Function to run the pipeline once on a dataset (executed in a fresh process)
+def run_scale(data_dir: str, work_dir: str, backend: str, drop_dir: str = None, reset: bool = True):
+    """
+    Runs every pipeline stage, followed by the dashboard export, on one dataset and measures it.
+    Meant to run in its own process so that the peak memory belongs to this run alone.
+    
+    Parameters:
+    data_dir (str): The directory holding the synthetic dataset.
+    work_dir (str): A scratch directory for the pipeline's outputs and state.
+    backend (str): The execution backend to use.
+    drop_dir (str): The CSV drop directory to ingest from (defaults to the dataset's csv_drops directory).
+    reset (bool): Whether to empty work_dir first; False continues from the state of an earlier run.
+    
+    Returns:
+    dict: The per-stage wall times, total time, peak memory of the run and of its worker processes, and any error raised.
+    """
+    import automation_pipeline, dashboard_export
+    
+    if reset:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir, exist_ok=True)
+    configure_pipeline_paths(data_dir, work_dir, backend, drop_dir)
+    
+    stage_seconds = {}
+    
+    @contextlib.contextmanager
+    def stage_timer(stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage_seconds[stage] = round(time.perf_counter() - start, 3)
+    
+    error = None
+    start = time.perf_counter()
+    with open(os.path.join(work_dir, "pipeline_log.txt"), "a") as log, contextlib.redirect_stdout(log):
+        try:
+            automation_pipeline.run_pipeline(stage_timer)
+            with stage_timer("export"):
+                dashboard_export.export_dashboard_data()
+        except Exception:
+            error = traceback.format_exc()
+            print(error)
+    
+    return {
+        "stage_seconds": stage_seconds,
+        "total_seconds": round(time.perf_counter() - start, 3),
+        "peak_memory_mb": peak_memory_mb(),
+        "peak_child_memory_mb": peak_memory_mb(children=True),
+        "error": error,
+    }
+
+# Function to generate (or reuse) the dataset for a scale
+def prepare_dataset(data_dir: str, vehicles: int, days: int, samples_per_day: int):
+    """
+    Generates the synthetic dataset for a scale, reusing an existing one generated with the same parameters.
+    
+    Parameters:
+    data_dir (str): The directory for the dataset.
+    vehicles (int): The number of vehicles.
+    days (int): The number of days of history.
+    samples_per_day (int): The number of records per vehicle per day.
+    
+    Returns:
+    dict: The dataset description, including the number of rows generated.
+    """
+    params = {"vehicles": vehicles, "days": days, "samples_per_day": samples_per_day}
+    params_path = os.path.join(data_dir, "dataset.json")
+    try:
+        with open(params_path, "r") as f:
+            dataset = json.load(f)
+        if dataset["params"] == params:
+            return dataset
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    
+    shutil.rmtree(data_dir, ignore_errors=True)
+    written = generate_fleet_dataset(data_dir, vehicles, days, samples_per_day)
+    dataset = {"params": params, "rows": written["sql_rows"] + written["csv_rows"]}
+    with open(params_path, "w") as f:
+        json.dump(dataset, f)
+    return dataset
+
+# Function to compare a benchmark run with the baseline
+def find_regressions(run: dict, baseline: dict):
+    """
+    Compares each scale of a run with the same scale in the baseline run.
+    
+    Parameters:
+    run (dict): The benchmark run to check.
+    baseline (dict): The baseline benchmark run.
+    
+    Returns:
+    list: A description of every failed scale or threshold exceeded.
+    """
+    regressions = []
+    for name, result in run["scales"].items():
+        if result["error"]:
+            regressions.append(f"{name}: pipeline failed")
+            continue
+        reference = baseline.get("scales", {}).get(name)
+        if not reference or reference.get("error"):
+            continue
+        if result["total_seconds"] > reference["total_seconds"] * (1 + BENCHMARK_TIME_TOLERANCE):
+            regressions.append(f"{name}: total time {result['total_seconds']}s vs baseline {reference['total_seconds']}s")
+        for field, label in (("peak_memory_mb", "peak memory"), ("peak_child_memory_mb", "peak worker memory")):
+            if (result.get(field) and reference.get(field)
+                    and result[field] > reference[field] * (1 + BENCHMARK_MEMORY_TOLERANCE)):
+                regressions.append(f"{name}: {label} {result[field]} MB vs baseline {reference[field]} MB")
+    return regressions
+
+# Function to compare two output files of the pipeline
+def compare_output_files(reference_path: str, candidate_path: str, key_columns: list, tolerance: float = PARITY_TOLERANCE):
+    """
+    Compares two CSV outputs independently of row and column order: both are sorted on the key columns,
+    numeric columns must match within the tolerance (with equal missing and infinite values) and the
+    other columns must match exactly. The tolerance is applied both absolutely and relatively, so large
+    values (e.g. ratios with a denominator close to zero) may differ by the engines' rounding.
+    
+    Parameters:
+    reference_path (str): The reference output.
+    candidate_path (str): The output to check.
+    key_columns (list): The columns identifying a row.
+    tolerance (float): The absolute and relative tolerance for numeric values.
+    
+    Returns:
+    list: A description of every difference found.
+    """
+    name = os.path.basename(reference_path)
+    try:
+        reference, candidate = pd.read_csv(reference_path), pd.read_csv(candidate_path)
+    except Exception as e:
+        return [f"{name}: could not be read ({e})"]
+    
+    differences = []
+    if set(reference.columns) != set(candidate.columns):
+        differences.append(f"{name}: columns differ ({sorted(set(reference.columns) ^ set(candidate.columns))})")
+    if len(reference) != len(candidate):
+        differences.append(f"{name}: {len(candidate)} rows vs {len(reference)} in the reference")
+    if differences:
+        return differences
+    
+    reference = reference.sort_values(key_columns, kind="stable").reset_index(drop=True)
+    candidate = candidate.sort_values(key_columns, kind="stable").reset_index(drop=True)[reference.columns]
+    for col in reference.columns:
+        if pd.api.types.is_numeric_dtype(reference[col]) and pd.api.types.is_numeric_dtype(candidate[col]):
+            equal = np.isclose(candidate[col].to_numpy(float), reference[col].to_numpy(float), rtol=tolerance, atol=tolerance,
+                               equal_nan=True)
+        else:
+            equal = (candidate[col].astype(str) == reference[col].astype(str)).to_numpy()
+        if not equal.all():
+            differences.append(f"{name}: column {col} differs in {int((~equal).sum())} row(s)")
+    return differences
+
+# Function to check that several backends produce the same outputs
+def run_parity_check(scale: str, backends: list, benchmark_dir: str = None):
+    """
+    Runs the pipeline with each backend on the same dataset in two ingestion rounds (the first half of the
+    CSV drops, then the rest), so that the incremental ingestion state is exercised, and compares the processed
+    data and dashboard export of every backend with those of the first one.
+    
+    Parameters:
+    scale (str): The name of the scale in BENCHMARK_SCALES to run.
+    backends (list): The backends to compare; the first one is the reference.
+    benchmark_dir (str): The directory for datasets and outputs (defaults to BENCHMARK_DIRECTORY).
+    
+    Returns:
+    list: A description of every failure or difference found.
+    """
+    benchmark_dir = benchmark_dir or BENCHMARK_DIRECTORY
+    settings = BENCHMARK_SCALES[scale]
+    data_dir = os.path.join(benchmark_dir, "data", scale)
+    prepare_dataset(data_dir, settings["vehicles"], settings["days"], BENCHMARK_SAMPLES_PER_DAY)
+    drop_files = sorted(os.listdir(os.path.join(data_dir, "csv_drops")))
+    rounds = [drop_files[:len(drop_files) // 2], drop_files[len(drop_files) // 2:]]
+    
+    problems, work_dirs = [], {}
+    for backend in backends:
+        work_dirs[backend] = os.path.join(benchmark_dir, "parity", scale, backend)
+        drop_dir = work_dirs[backend] + "_drops"
+        shutil.rmtree(drop_dir, ignore_errors=True)
+        os.makedirs(drop_dir)
+        for i, batch in enumerate(rounds):
+            for file_name in batch:
+                shutil.copy2(os.path.join(data_dir, "csv_drops", file_name), drop_dir)
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                result = executor.submit(run_scale, data_dir, work_dirs[backend], backend, drop_dir, i == 0).result()
+            if result["error"]:
+                problems.append(f"{backend}: round {i + 1} failed")
+        print(f"{backend}: outputs written to {work_dirs[backend]}")
+    
+    reference = backends[0]
+    for backend in backends[1:]:
+        for file_name, key_columns in (("processed_data.csv", DEDUP_KEY_COLUMNS), ("dashboard_export.csv", ["vehicle_id"])):
+            problems.extend(f"{backend} vs {reference}: {difference}" for difference in compare_output_files(
+                os.path.join(work_dirs[reference], file_name), os.path.join(work_dirs[backend], file_name), key_columns))
+    
+    for problem in problems:
+        print(f"PARITY: {problem}")
+    if not problems:
+        print(f"{scale}: {', '.join(backends)} produced the same outputs.")
+    return problems
+
+# Main function to run the benchmark suite
+def run_benchmark(scales: list = None, backend: str = EXECUTION_BACKEND, benchmark_dir: str = None,
+                  update_baseline: bool = False):
+    """
+    Runs the pipeline at each scale, appends the results to the results file, and checks them against the
+    baseline recorded for the same backend.
+    
+    Parameters:
+    scales (list): The names of the scales in BENCHMARK_SCALES to run (defaults to all of them).
+    backend (str): The execution backend to benchmark.
+    benchmark_dir (str): The directory for datasets and results (defaults to BENCHMARK_DIRECTORY).
+    update_baseline (bool): Whether to save this run as the new baseline.
+    
+    Returns:
+    tuple: The benchmark run and the list of regressions found.
+    """
+    benchmark_dir = benchmark_dir or BENCHMARK_DIRECTORY
+    results_path = os.path.join(benchmark_dir, os.path.basename(RESULTS_PATH))
+    baseline_path = os.path.join(benchmark_dir, os.path.basename(BASELINE_PATH).format(backend=backend))
+    scales = scales or list(BENCHMARK_SCALES)
+    
+    run = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "backend": backend,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scales": {},
+    }
+    
+    for name in scales:
+        scale = BENCHMARK_SCALES[name]
+        data_dir = os.path.join(benchmark_dir, "data", name)
+        print(f"Preparing {name} dataset ({scale['vehicles']} vehicles x {scale['days']} days)...")
+        dataset = prepare_dataset(data_dir, scale["vehicles"], scale["days"], BENCHMARK_SAMPLES_PER_DAY)
+        
+        # A fresh process per scale keeps the peak memory measurement specific to the run
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            result = executor.submit(run_scale, data_dir, os.path.join(benchmark_dir, "work", name), backend).result()
+        
+        result["rows"] = dataset["rows"]
+        result["rows_per_second"] = round(dataset["rows"] / result["total_seconds"], 1) if result["total_seconds"] else None
+        run["scales"][name] = result
+        status = "FAILED" if result["error"] else f"{result['total_seconds']}s, {result['rows_per_second']} rows/s"
+        print(f"{name}: {dataset['rows']} rows, {status}, peak memory {result['peak_memory_mb']} MB "
+              f"(workers {result['peak_child_memory_mb']} MB)")
+        print(f"  stages: {result['stage_seconds']}")
+    
+    # Append the run to the results history
+    try:
+        with open(results_path, "r") as f:
+            history = json.load(f)
+    except (FileNotFoundError, ValueError):
+        history = []
+    history.append(run)
+    with open(results_path, "w") as f:
+        json.dump(history, f, indent=2)
+    print(f"Benchmark results saved to {results_path}")
+    
+    regressions = []
+    try:
+        with open(baseline_path, "r") as f:
+            regressions = find_regressions(run, json.load(f))
+    except FileNotFoundError:
+        print("No baseline found; run with --update-baseline to record one.")
+    
+    if update_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline updated at {baseline_path}")
+    
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    return run, regressions
+
+# Example usage of the function
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vehicle performance pipeline on synthetic data.")
+    parser.add_argument("--scales", nargs="+", choices=list(BENCHMARK_SCALES), help="Scales to run (default: all)")
+    parser.add_argument("--backend", choices=["pandas", "duckdb", "distributed"], default=EXECUTION_BACKEND)
+    parser.add_argument("--benchmark-dir", default=BENCHMARK_DIRECTORY)
+    parser.add_argument("--update-baseline", action="store_true", help="Save this run as the new baseline")
+    parser.add_argument("--parity", nargs="+", choices=["pandas", "duckdb", "distributed"], metavar="BACKEND",
+                        help="Instead of timing, check that these backends produce the same outputs")
+    args = parser.parse_args()
+    
+    os.makedirs(args.benchmark_dir, exist_ok=True)
+    if args.parity:
+        found = [problem for name in (args.scales or list(BENCHMARK_SCALES))
+                 for problem in run_parity_check(name, args.parity, args.benchmark_dir)]
+        sys.exit(1 if found else 0)
+    _, found = run_benchmark(args.scales, args.backend, args.benchmark_dir, args.update_baseline)
+    sys.exit(1 if found else 0)
@@ -8,6 +8,9 @@ import os
 BASE_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/"
 SQL_DATABASE_PATH = os.path.join(BASE_PATH, "vehicle_data.db")
 CSV_FILE_PATH = os.path.join(BASE_PATH, "vehicle_performance_data.csv")
+CSV_DROP_DIRECTORY = os.path.join(BASE_PATH, "csv_drops")  # Vehicles upload their daily CSV (or .csv.gz) files here
+CSV_MANIFEST_PATH = os.path.join(BASE_PATH, "ingested_files.json")  # Tracks which CSV files were already ingested
+RAW_STORE_PATH = os.path.join(BASE_PATH, "ingested_records.db")  # Every ingested CSV record, so runs see the full history
 PROCESSED_DATA_PATH = os.path.join(BASE_PATH, "processed_data.csv")
 EXPORT_FILE_PATH = os.path.join(BASE_PATH, "dashboard_export.csv")
 MODEL_PATH = os.path.join(BASE_PATH, "model.pkl")
@@ -19,12 +22,71 @@ DB_NAME = "vehicle_telematics"
 DB_USER = "satej"
 DB_PASSWORD = "yourpassword"  # Replace with your actual password (can be loaded from an environment variable for security)
 
+# SQL access settings (used by data_collection.py)
+SQL_TABLE_NAME = "vehicle_performance"
+SQL_START_DATE = "2023-01-01"  # Only rows on or after this date are fetched from the database
+SQLITE_POOL_SIZE = 4  # Maximum number of idle read-only connections kept per database file
+SQLITE_MMAP_SIZE = 268435456  # 256 MB memory-mapped I/O window for read connections
+SQLITE_CACHE_SIZE = -65536  # Page cache per connection; negative values are in KiB (64 MB)
+SQLITE_JOURNAL_MODE = "WAL"  # Use "DELETE" when distributed workers on other hosts read the databases over a network share
+
+# Ingestion settings
+INGESTION_WORKERS = os.cpu_count() or 4  # Number of CSV files parsed concurrently
+
+# Deduplication settings (used by deduplication.py)
+DEDUP_KEY_COLUMNS = ["vehicle_id", "timestamp"]  # Columns identifying a unique telematics record
+BLOOM_FILTER_CAPACITY = 10000000  # Number of record keys the Bloom filter is sized for
+BLOOM_FILTER_ERROR_RATE = 0.01  # Bloom filter false positive rate at capacity (false positives cost an index lookup)
+
+# Columns consumed by the downstream stages; only these are projected out of the data sources
+PIPELINE_COLUMNS = [
+    "vehicle_id", "date", "timestamp", "distance_traveled", "fuel_consumed",
+    "average_speed", "engine_load", "fuel_efficiency", "maintenance_required",
+]
+
 # Time settings (for automation pipeline frequency, etc.)
 CHECK_NEW_DATA_INTERVAL = 3600  # Check for new data every hour (in seconds)
 DATA_UPDATE_THRESHOLD = 86400  # 1 day (in seconds), check if data is updated within the last 24 hours
 
+# Feature store settings (used by feature_store.py)
+FEATURE_ROLLING_WINDOW = 24  # Number of most recent records per vehicle averaged into the rolling features
+
+# Dashboard export settings (used by dashboard_export.py)
+EXPORT_CHUNK_SIZE = 100000  # Rows of the processed file aggregated at a time when the export is built out of memory
+
+# Execution backend for cleaning, feature engineering and export: "pandas" (in memory), "duckdb" (out-of-core)
+# or "distributed" (sharded over worker processes)
+EXECUTION_BACKEND = "pandas"
+DUCKDB_MEMORY_LIMIT = "4GB"  # DuckDB spills to DUCKDB_TEMP_DIRECTORY beyond this limit
+DUCKDB_THREADS = os.cpu_count() or 4
+DUCKDB_TEMP_DIRECTORY = os.path.join(BASE_PATH, "duckdb_tmp")
+
+# Distributed settings (used by distributed_pipeline.py when EXECUTION_BACKEND is "distributed")
+WORK_QUEUE_DIRECTORY = os.path.join(BASE_PATH, "work_queue")  # Must be on storage shared by every worker host
+DISTRIBUTED_WORKERS = os.cpu_count() or 4  # Local worker processes started by the coordinator
+DISTRIBUTED_VEHICLE_SHARDS = 32  # Number of vehicle_id ranges the fleet is split into
+DISTRIBUTED_SHARD_DAYS = None  # Split each vehicle range further into date ranges of this many days
+SHARD_LEASE_SECONDS = 1800  # A running shard is reassigned if its worker has not finished it within this time
+MAX_SHARD_ATTEMPTS = 3  # A shard is marked failed after this many failed attempts
+
 # Model settings
 RANDOM_FOREST_N_ESTIMATORS = 100  # Number of trees in Random Forest
+MODEL_TRAINING_MODE = "batch"  # "batch" (Random Forest in memory) or "incremental" (streamed SGD, fixed memory)
+INCREMENTAL_CHUNK_SIZE = 100000  # Rows per streamed training chunk
+INCREMENTAL_EPOCHS = 3  # Passes of the incremental classifier over the training records
+INCREMENTAL_HOLDOUT_FRACTION = 0.2  # Share of records (chosen by key hash) held out for evaluation
+INCREMENTAL_ALPHA = 0.0001  # Regularization strength of the SGD classifier
+COMPARISON_SAMPLE_SIZE = 200000  # Training records for the batch forest in the comparison report
+
+# Benchmark settings (used by benchmark.py); each scale is a synthetic fleet of vehicles x days of history
+BENCHMARK_SCALES = {
+    "small": {"vehicles": 50, "days": 7},
+    "medium": {"vehicles": 200, "days": 30},
+    "large": {"vehicles": 1000, "days": 90},
+}
+BENCHMARK_SAMPLES_PER_DAY = 24  # One record per vehicle per hour
+BENCHMARK_TIME_TOLERANCE = 0.20  # A run is a regression if it is more than 20% slower than the baseline
+BENCHMARK_MEMORY_TOLERANCE = 0.20  # ...or uses more than 20% more peak memory
 
 # Logging settings (you can change these to integrate with a logging library if needed)
 LOGGING_ENABLED = True
@@ -36,6 +98,9 @@ def print_config():
     print(f"BASE_PATH: {BASE_PATH}")
     print(f"SQL_DATABASE_PATH: {SQL_DATABASE_PATH}")
     print(f"CSV_FILE_PATH: {CSV_FILE_PATH}")
+    print(f"CSV_DROP_DIRECTORY: {CSV_DROP_DIRECTORY}")
+    print(f"CSV_MANIFEST_PATH: {CSV_MANIFEST_PATH}")
+    print(f"RAW_STORE_PATH: {RAW_STORE_PATH}")
     print(f"PROCESSED_DATA_PATH: {PROCESSED_DATA_PATH}")
     print(f"EXPORT_FILE_PATH: {EXPORT_FILE_PATH}")
     print(f"MODEL_PATH: {MODEL_PATH}")
@@ -43,8 +108,37 @@ def print_config():
     print(f"DB_PORT: {DB_PORT}")
     print(f"DB_NAME: {DB_NAME}")
     print(f"DB_USER: {DB_USER}")
+    print(f"SQL_TABLE_NAME: {SQL_TABLE_NAME}")
+    print(f"SQL_START_DATE: {SQL_START_DATE}")
+    print(f"SQLITE_POOL_SIZE: {SQLITE_POOL_SIZE}")
+    print(f"SQLITE_MMAP_SIZE: {SQLITE_MMAP_SIZE}")
+    print(f"SQLITE_CACHE_SIZE: {SQLITE_CACHE_SIZE}")
+    print(f"SQLITE_JOURNAL_MODE: {SQLITE_JOURNAL_MODE}")
+    print(f"INGESTION_WORKERS: {INGESTION_WORKERS}")
+    print(f"DEDUP_KEY_COLUMNS: {DEDUP_KEY_COLUMNS}")
+    print(f"BLOOM_FILTER_CAPACITY: {BLOOM_FILTER_CAPACITY}")
+    print(f"BLOOM_FILTER_ERROR_RATE: {BLOOM_FILTER_ERROR_RATE}")
     print(f"CHECK_NEW_DATA_INTERVAL: {CHECK_NEW_DATA_INTERVAL}")
     print(f"DATA_UPDATE_THRESHOLD: {DATA_UPDATE_THRESHOLD}")
+    print(f"FEATURE_ROLLING_WINDOW: {FEATURE_ROLLING_WINDOW}")
+    print(f"EXPORT_CHUNK_SIZE: {EXPORT_CHUNK_SIZE}")
+    print(f"EXECUTION_BACKEND: {EXECUTION_BACKEND}")
+    print(f"DUCKDB_MEMORY_LIMIT: {DUCKDB_MEMORY_LIMIT}")
+    print(f"DUCKDB_THREADS: {DUCKDB_THREADS}")
+    print(f"DUCKDB_TEMP_DIRECTORY: {DUCKDB_TEMP_DIRECTORY}")
+    print(f"MODEL_TRAINING_MODE: {MODEL_TRAINING_MODE}")
+    print(f"INCREMENTAL_CHUNK_SIZE: {INCREMENTAL_CHUNK_SIZE}")
+    print(f"INCREMENTAL_EPOCHS: {INCREMENTAL_EPOCHS}")
+    print(f"INCREMENTAL_HOLDOUT_FRACTION: {INCREMENTAL_HOLDOUT_FRACTION}")
+    print(f"INCREMENTAL_ALPHA: {INCREMENTAL_ALPHA}")
+    print(f"COMPARISON_SAMPLE_SIZE: {COMPARISON_SAMPLE_SIZE}")
+    print(f"WORK_QUEUE_DIRECTORY: {WORK_QUEUE_DIRECTORY}")
+    print(f"DISTRIBUTED_WORKERS: {DISTRIBUTED_WORKERS}")
+    print(f"DISTRIBUTED_VEHICLE_SHARDS: {DISTRIBUTED_VEHICLE_SHARDS}")
+    print(f"DISTRIBUTED_SHARD_DAYS: {DISTRIBUTED_SHARD_DAYS}")
+    print(f"SHARD_LEASE_SECONDS: {SHARD_LEASE_SECONDS}")
+    print(f"MAX_SHARD_ATTEMPTS: {MAX_SHARD_ATTEMPTS}")
+    print(f"BENCHMARK_SCALES: {BENCHMARK_SCALES}")
 
 # Example usage of configuration print function
 if __name__ == "__main__":
@@ -2,7 +2,9 @@
 # This script exports the processed data to Tableau or any other visualization tool for creating a dashboard.
 # It ensures that the data is in the correct format for use in the dashboard and updates it periodically.
 
+import os
 import pandas as pd
+from config import EXECUTION_BACKEND, EXPORT_CHUNK_SIZE
 
 # Define the path to the processed data file (assuming it has been saved as 'processed_data.csv')
 PROCESSED_DATA_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/processed_data.csv"
@@ -57,6 +59,42 @@ def prepare_data_for_export(data: pd.DataFrame):
     print("Data prepared for export.")
     return export_data
 
+# Function to aggregate the processed data file for export one chunk at a time
+def prepare_data_for_export_in_chunks(file_path: str, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Computes the same per-vehicle aggregates as prepare_data_for_export while reading the processed data file in
+    chunks, so that memory use does not grow with the length of the history.
+    
+    Parameters:
+    file_path (str): The path to the CSV file containing the processed data.
+    chunk_size (int): The number of rows read at a time.
+    
+    Returns:
+    pd.DataFrame: The prepared data ready for export.
+    """
+    mean_columns = ['fuel_efficiency', 'average_speed', 'engine_load']
+    sum_columns = ['maintenance_required', 'idle_time']
+    try:
+        partials = []
+        for chunk in pd.read_csv(file_path, usecols=['vehicle_id'] + mean_columns + sum_columns, chunksize=chunk_size):
+            grouped = chunk.groupby('vehicle_id')
+            partials.append(pd.concat([grouped[mean_columns + sum_columns].sum(),
+                                       grouped[mean_columns].count().add_suffix('_count')], axis=1))
+    except Exception as e:
+        print(f"Error loading processed data from {file_path}: {e}")
+        return pd.DataFrame()  # Return an empty DataFrame in case of error
+    if not partials:
+        return pd.DataFrame()
+    
+    # Combine the chunk totals of each vehicle into its means and sums
+    totals = pd.concat(partials).groupby(level=0).sum()
+    export_data = pd.DataFrame(index=totals.index)
+    for col in ['fuel_efficiency', 'maintenance_required', 'average_speed', 'engine_load', 'idle_time']:
+        export_data[col] = totals[col] / totals[col + '_count'] if col in mean_columns else totals[col]
+    
+    print("Data prepared for export.")
+    return export_data.reset_index()
+
 # Function to export the data to a CSV file (for Tableau or other tools)
 def export_to_csv(data: pd.DataFrame, file_path: str):
     """
@@ -76,7 +114,26 @@ def export_to_csv(data: pd.DataFrame, file_path: str):
 def export_dashboard_data():
     """
     Loads the processed data, prepares it for export, and then exports it to a CSV file for use in a dashboard.
+    With the duckdb execution backend the processed file is aggregated by DuckDB without loading it into memory.
+    With the distributed backend the export is written while the shards are merged, so it is only rebuilt
+    (in chunks) when it is older than the processed file.
     """
+    if EXECUTION_BACKEND == "duckdb":
+        import query_engine
+        query_engine.export_dashboard_data(PROCESSED_DATA_PATH, EXPORT_FILE_PATH)
+        return
+    if EXECUTION_BACKEND == "distributed":
+        if (os.path.exists(EXPORT_FILE_PATH) and os.path.exists(PROCESSED_DATA_PATH)
+                and os.path.getmtime(EXPORT_FILE_PATH) >= os.path.getmtime(PROCESSED_DATA_PATH)):
+            print("Dashboard export is up to date with the processed data.")
+            return
+        prepared_data = prepare_data_for_export_in_chunks(PROCESSED_DATA_PATH)
+        if not prepared_data.empty:
+            export_to_csv(prepared_data, EXPORT_FILE_PATH)
+        else:
+            print("No data available to export.")
+        return
+    
     # Load the processed data
     data = load_processed_data(PROCESSED_DATA_PATH)
     
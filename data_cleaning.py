@@ -8,6 +8,9 @@ import numpy as np
 # Define the path to the collected data file (assuming it has been saved as 'merged_data.csv')
 DATA_FILE_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/merged_data.csv"
 
+# Identifier and label columns are numeric but must not be treated as outliers or standardized
+NON_FEATURE_COLUMNS = ["vehicle_id", "maintenance_required"]
+
 # Function to load the collected data from a CSV file
 def load_data(file_path: str):
     """
@@ -28,12 +31,13 @@ def load_data(file_path: str):
         return pd.DataFrame()  # Return an empty DataFrame in case of error
 
 # Function to handle missing values by imputing or removing rows
-def handle_missing_values(data: pd.DataFrame):
+def handle_missing_values(data: pd.DataFrame, medians: dict = None):
     """
     Handles missing values in the dataset by either imputing or dropping rows based on the column importance.
     
     Parameters:
     data (pd.DataFrame): The raw data that needs to be cleaned.
+    medians (dict): Precomputed median of each numerical column (e.g. over all shards); computed from the data if omitted.
     
     Returns:
     pd.DataFrame: The cleaned data with missing values handled.
@@ -41,8 +45,8 @@ def handle_missing_values(data: pd.DataFrame):
     # Impute missing values in numerical columns with the median
     numeric_columns = data.select_dtypes(include=[np.number]).columns
     for col in numeric_columns:
-        median_value = data[col].median()
-        data[col].fillna(median_value, inplace=True)
+        median_value = data[col].median() if medians is None else medians[col]
+        data[col] = data[col].fillna(median_value)
         print(f"Missing values in {col} replaced with median value: {median_value}")
     
     # Drop rows with missing values in categorical columns (if any)
@@ -53,7 +57,7 @@ def handle_missing_values(data: pd.DataFrame):
     return data
 
 # Function to remove outliers using the Z-score method
-def remove_outliers(data: pd.DataFrame, threshold: float = 3.0):
+def remove_outliers(data: pd.DataFrame, threshold: float = 3.0, means: dict = None, stds: dict = None):
     """
     Removes outliers in the dataset by using the Z-score method. Any data point with a Z-score greater than
     the specified threshold is considered an outlier and is removed.
@@ -61,13 +65,17 @@ def remove_outliers(data: pd.DataFrame, threshold: float = 3.0):
     Parameters:
     data (pd.DataFrame): The cleaned data from which outliers need to be removed.
     threshold (float): The Z-score threshold above which data points will be considered outliers.
+    means (dict): Precomputed mean of each numerical feature column; computed from the data if omitted.
+    stds (dict): Precomputed standard deviation of each numerical feature column; computed from the data if omitted.
     
     Returns:
     pd.DataFrame: The data with outliers removed.
     """
     # Calculate Z-scores for the numeric columns
-    numeric_columns = data.select_dtypes(include=[np.number]).columns
-    z_scores = np.abs((data[numeric_columns] - data[numeric_columns].mean()) / data[numeric_columns].std())
+    numeric_columns = data.select_dtypes(include=[np.number]).columns.difference(NON_FEATURE_COLUMNS, sort=False)
+    mean = data[numeric_columns].mean() if means is None else pd.Series(means)[numeric_columns]
+    std = data[numeric_columns].std() if stds is None else pd.Series(stds)[numeric_columns]
+    z_scores = np.abs((data[numeric_columns] - mean) / std)
     
     # Identify rows where any Z-score exceeds the threshold
     data_no_outliers = data[(z_scores < threshold).all(axis=1)]
@@ -76,18 +84,22 @@ def remove_outliers(data: pd.DataFrame, threshold: float = 3.0):
     return data_no_outliers
 
 # Function to standardize the data (optional, for further analysis)
-def standardize_data(data: pd.DataFrame):
+def standardize_data(data: pd.DataFrame, means: dict = None, stds: dict = None):
     """
     Standardizes the data by scaling numerical features to have zero mean and unit variance.
     
     Parameters:
     data (pd.DataFrame): The cleaned data to be standardized.
+    means (dict): Precomputed mean of each numerical feature column; computed from the data if omitted.
+    stds (dict): Precomputed standard deviation of each numerical feature column; computed from the data if omitted.
     
     Returns:
     pd.DataFrame: The standardized data.
     """
-    numeric_columns = data.select_dtypes(include=[np.number]).columns
-    data[numeric_columns] = (data[numeric_columns] - data[numeric_columns].mean()) / data[numeric_columns].std()
+    numeric_columns = data.select_dtypes(include=[np.number]).columns.difference(NON_FEATURE_COLUMNS, sort=False)
+    mean = data[numeric_columns].mean() if means is None else pd.Series(means)[numeric_columns]
+    std = data[numeric_columns].std() if stds is None else pd.Series(stds)[numeric_columns]
+    data[numeric_columns] = (data[numeric_columns] - mean) / std
     print("Data has been standardized.")
     return data
 
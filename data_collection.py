@@ -3,32 +3,209 @@
 # The primary objective is to retrieve the raw vehicle performance data and prepare it for subsequent cleaning and analysis.
 
 import pandas as pd
+import numpy as np
 import sqlite3  # Assuming SQLite for the SQL database connection
 import os
+import json
+import pathlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from deduplication import deduplicate_records, hash_record_keys, open_hash_index, lookup_indexed_hashes, commit_keys
+from config import (SQL_TABLE_NAME, SQL_START_DATE, SQLITE_POOL_SIZE, SQLITE_MMAP_SIZE,
+                    SQLITE_CACHE_SIZE, SQLITE_JOURNAL_MODE, INGESTION_WORKERS, PIPELINE_COLUMNS, DEDUP_KEY_COLUMNS,
+                    CSV_DROP_DIRECTORY, CSV_MANIFEST_PATH, RAW_STORE_PATH)
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional; the pandas parser is used when it is not installed
+    pa = None
+    pa_csv = None
 
 # Define paths to the data sources
 SQL_DATABASE_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/vehicle_data.db"
 CSV_FILE_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/vehicle_performance_data.csv"
 
+# Columns kept as text when parsing CSV files so they line up with the values stored in SQL
+CSV_STRING_COLUMNS = ["date", "timestamp"]
+CSV_EXTENSIONS = (".csv", ".csv.gz")
+
+# Idle read-only connections, one pool per database file
+_connection_pools = {}
+_prepared_databases = set()
+_pool_lock = threading.Lock()
+
+# Function to prepare the database for fast reads (journal mode and lookup indexes)
+def prepare_database(db_path: str, table: str = SQL_TABLE_NAME):
+    """
+    Switches the database to SQLITE_JOURNAL_MODE journaling and creates the indexes used by the date and vehicle
+    filters. WAL needs shared memory, so it only works when every reader runs on the same host.
+    This needs write access and is done once per database file per process; failures are reported but
+    do not prevent reading.
+    
+    Parameters:
+    db_path (str): The path to the SQLite database file.
+    table (str): The table holding the vehicle performance data.
+    """
+    if not os.path.exists(db_path):
+        return
+    with _pool_lock:
+        if db_path in _prepared_databases:
+            return
+        _prepared_databases.add(db_path)
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_date" ON "{table}" (date)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_vehicle_date" ON "{table}" (vehicle_id, date)')
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"Database prepared with {SQLITE_JOURNAL_MODE} journaling and date/vehicle indexes.")
+    except Exception as e:
+        print(f"Warning: could not prepare database {db_path}: {e}")
+
+# Function to open a tuned read-only connection
+def _open_read_connection(db_path: str):
+    """
+    Opens a read-only SQLite connection with memory-mapped I/O and a larger page cache.
+    
+    Parameters:
+    db_path (str): The path to the SQLite database file.
+    
+    Returns:
+    sqlite3.Connection: The configured connection.
+    """
+    uri = pathlib.Path(db_path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute(f"PRAGMA mmap_size = {int(SQLITE_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA cache_size = {int(SQLITE_CACHE_SIZE)}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+# Context manager to borrow a pooled read-only connection
+@contextmanager
+def pooled_connection(db_path: str = None):
+    """
+    Borrows a read-only connection from the pool for the given database, opening a new one if none
+    is idle. The connection is returned to the pool afterwards instead of being closed.
+    
+    Parameters:
+    db_path (str): The path to the SQLite database file (defaults to SQL_DATABASE_PATH).
+    
+    Yields:
+    sqlite3.Connection: A read-only connection to the database.
+    """
+    db_path = db_path or SQL_DATABASE_PATH
+    prepare_database(db_path)
+    with _pool_lock:
+        pool = _connection_pools.setdefault(db_path, queue.LifoQueue(maxsize=SQLITE_POOL_SIZE))
+    
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _open_read_connection(db_path)
+    
+    try:
+        yield conn
+    finally:
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+# Function to close all pooled connections (e.g. before the database file is replaced)
+def close_connections():
+    """
+    Closes every idle pooled connection and forgets which databases were prepared.
+    """
+    with _pool_lock:
+        for pool in _connection_pools.values():
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
+        _connection_pools.clear()
+        _prepared_databases.clear()
+
+# Function to list the columns available in a table
+def get_table_columns(table: str = SQL_TABLE_NAME, db_path: str = None):
+    """
+    Returns the column names of the given table, in table order.
+    
+    Parameters:
+    table (str): The table to inspect.
+    db_path (str): The path to the SQLite database file (defaults to SQL_DATABASE_PATH).
+    
+    Returns:
+    list: The column names of the table.
+    """
+    with pooled_connection(db_path) as conn:
+        rows = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+    return [row[1] for row in rows]
+
+# Function to build a parameterized query with projection and filter pushdown
+def build_sql_query(columns: list = None, start_date: str = None, end_date: str = None,
+                    vehicle_ids: list = None, vehicle_id_range: tuple = None, table: str = SQL_TABLE_NAME):
+    """
+    Builds a parameterized SELECT that only projects the requested columns and pushes the date and
+    vehicle filters into SQL so that they can be served by the (date) and (vehicle_id, date) indexes.
+    
+    Parameters:
+    columns (list): The columns to select; all columns are selected when omitted.
+    start_date (str): Inclusive lower bound on the date column (ISO format).
+    end_date (str): Exclusive upper bound on the date column (ISO format).
+    vehicle_ids (list): Restrict the result to these vehicles.
+    vehicle_id_range (tuple): Restrict the result to vehicles between these two ids (inclusive).
+    table (str): The table to query.
+    
+    Returns:
+    tuple: The SQL query string and the list of parameters to bind to it.
+    """
+    projection = ", ".join(f'"{col}"' for col in columns) if columns else "*"
+    conditions = []
+    params = []
+    
+    if vehicle_ids is not None:
+        vehicle_ids = list(vehicle_ids)
+        conditions.append(f"vehicle_id IN ({', '.join('?' for _ in vehicle_ids)})" if vehicle_ids else "0")
+        params.extend(vehicle_ids)
+    if vehicle_id_range is not None:
+        conditions.append("vehicle_id BETWEEN ? AND ?")
+        params.extend(vehicle_id_range)
+    if start_date is not None:
+        conditions.append("date >= ?")
+        params.append(start_date)
+    if end_date is not None:
+        conditions.append("date < ?")
+        params.append(end_date)
+    
+    query = f'SELECT {projection} FROM "{table}"'
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query, params
+
 # Function to connect to SQL database and retrieve data
-def fetch_data_from_sql(query: str):
+def fetch_data_from_sql(query: str, params: list = None):
     """
-    Connects to the SQL database and executes the provided SQL query to retrieve the data.
+    Executes the provided SQL query on a pooled read-only connection to retrieve the data.
     
     Parameters:
     query (str): SQL query to retrieve the desired data from the database.
+    params (list): Values bound to the query placeholders, if any.
     
     Returns:
     pd.DataFrame: A Pandas DataFrame containing the result of the query.
     """
     try:
-        # Establish connection to the SQL database
-        conn = sqlite3.connect(SQL_DATABASE_PATH)
-        print("Successfully connected to the SQL database.")
-        
-        # Fetch data using the provided query
-        data = pd.read_sql(query, conn)
-        conn.close()
+        with pooled_connection(SQL_DATABASE_PATH) as conn:
+            # Fetch data using the provided query
+            data = pd.read_sql(query, conn, params=params)
         
         print(f"Data retrieved successfully from SQL database.")
         return data
@@ -36,43 +213,378 @@ def fetch_data_from_sql(query: str):
         print(f"Error fetching data from SQL: {e}")
         return pd.DataFrame()  # Return an empty DataFrame in case of error
 
+# Function to list the CSV files available for ingestion
+def list_csv_files(directory: str = None):
+    """
+    Lists the CSV (and gzip-compressed CSV) files in the drop directory, plus the legacy single CSV file
+    if it exists.
+    
+    Parameters:
+    directory (str): The directory vehicles upload their CSV files to (defaults to CSV_DROP_DIRECTORY).
+    
+    Returns:
+    list: The absolute paths of the CSV files, sorted by name.
+    """
+    directory = directory or CSV_DROP_DIRECTORY
+    file_paths = []
+    if os.path.isdir(directory):
+        with os.scandir(directory) as entries:
+            file_paths = [os.path.abspath(entry.path) for entry in entries
+                          if entry.is_file() and entry.name.lower().endswith(CSV_EXTENSIONS)]
+    if os.path.isfile(CSV_FILE_PATH):
+        file_paths.append(os.path.abspath(CSV_FILE_PATH))
+    return sorted(file_paths)
+
+# Function to compute a signature that changes whenever a file is rewritten
+def _file_signature(file_path: str):
+    stat = os.stat(file_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+# Function to load the manifest of already ingested CSV files
+def load_ingestion_manifest(manifest_path: str = None):
+    """
+    Loads the manifest mapping each ingested CSV file to the size and modification time it had when
+    it was ingested.
+    
+    Parameters:
+    manifest_path (str): The path to the manifest file (defaults to CSV_MANIFEST_PATH).
+    
+    Returns:
+    dict: The manifest, empty if the file does not exist or cannot be read.
+    """
+    manifest_path = manifest_path or CSV_MANIFEST_PATH
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Error reading ingestion manifest {manifest_path}: {e}")
+        return {}
+
+# Function to find the CSV files that have not been ingested yet
+def find_new_csv_files(directory: str = None, manifest_path: str = None):
+    """
+    Returns the CSV files that are new, or that changed since they were last ingested.
+    
+    Parameters:
+    directory (str): The CSV drop directory (defaults to CSV_DROP_DIRECTORY).
+    manifest_path (str): The path to the manifest file (defaults to CSV_MANIFEST_PATH).
+    
+    Returns:
+    list: The paths of the CSV files that still need to be ingested.
+    """
+    manifest = load_ingestion_manifest(manifest_path)
+    return [path for path in list_csv_files(directory) if manifest.get(path) != _file_signature(path)]
+
+# Function to record CSV files as ingested
+def mark_files_ingested(file_paths: list, manifest_path: str = None):
+    """
+    Adds the given files to the ingestion manifest so that they are skipped by later runs.
+    The manifest is replaced atomically so an interrupted write cannot corrupt it.
+    
+    Parameters:
+    file_paths (list): The paths of the files that were ingested.
+    manifest_path (str): The path to the manifest file (defaults to CSV_MANIFEST_PATH).
+    """
+    if not file_paths:
+        return
+    manifest_path = manifest_path or CSV_MANIFEST_PATH
+    manifest = load_ingestion_manifest(manifest_path)
+    for path in file_paths:
+        if os.path.exists(path):
+            manifest[path] = _file_signature(path)
+    
+    try:
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+        print(f"Recorded {len(file_paths)} ingested CSV file(s).")
+    except Exception as e:
+        print(f"Error writing ingestion manifest {manifest_path}: {e}")
+
+# Function to parse a single CSV file
+def read_csv_file(file_path: str, columns: list = None):
+    """
+    Parses a CSV or gzip-compressed CSV file. When pyarrow is installed its multithreaded parser is used,
+    otherwise the file is read with pandas. Only the requested columns are kept.
+    
+    Parameters:
+    file_path (str): The path to the CSV file.
+    columns (list): The columns to keep; columns missing from the file are skipped.
+    
+    Returns:
+    pd.DataFrame: The parsed data.
+    """
+    if pa_csv is not None:
+        # Only request the columns present in the header; empty cells are read as nulls, as pandas does
+        if columns is not None:
+            header = pd.read_csv(file_path, nrows=0).columns
+            columns = [col for col in columns if col in header]
+        convert_options = pa_csv.ConvertOptions(
+            column_types={col: pa.string() for col in CSV_STRING_COLUMNS},
+            include_columns=columns,
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=True,
+        )
+        table = pa_csv.read_csv(file_path, read_options=pa_csv.ReadOptions(use_threads=True),
+                                convert_options=convert_options)
+        # Columns without any value are typed as null; pandas reads them as float columns of NaN
+        for i, field in enumerate(table.schema):
+            if pa.types.is_null(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+        return table.to_pandas()
+    
+    usecols = (lambda col: col in columns) if columns is not None else None
+    return pd.read_csv(file_path, usecols=usecols, dtype={col: str for col in CSV_STRING_COLUMNS})
+
+# Function to read the CSV files concurrently
+def fetch_csv_files(file_paths: list, columns: list = None):
+    """
+    Parses the given CSV files concurrently on a thread pool. Files that fail to parse are reported
+    and left out of the result.
+    
+    Parameters:
+    file_paths (list): The paths of the CSV files to read.
+    columns (list): The columns to keep from each file.
+    
+    Returns:
+    tuple: A DataFrame with the rows of all files read, and the list of files read successfully.
+    """
+    if not file_paths:
+        return pd.DataFrame(), []
+    
+    def read_file(file_path):
+        try:
+            return read_csv_file(file_path, columns)
+        except Exception as e:
+            print(f"Error reading CSV file {file_path}: {e}")
+            return None
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(INGESTION_WORKERS, len(file_paths)))) as executor:
+        frames = list(executor.map(read_file, file_paths))
+    
+    ingested = [path for path, frame in zip(file_paths, frames) if frame is not None]
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    print(f"Data loaded from {len(ingested)} of {len(file_paths)} CSV file(s).")
+    return data, ingested
+
 # Function to read data from CSV file
 def fetch_data_from_csv():
     """
-    Reads the telematics data stored in a CSV file and returns it as a Pandas DataFrame.
+    Reads the telematics data from every CSV file that has not been ingested yet and returns it as a
+    Pandas DataFrame. The files are not recorded as ingested; collect_data does that once the data
+    has been collected.
+    
+    Returns:
+    pd.DataFrame: A Pandas DataFrame containing the data from the CSV files.
+    """
+    data, _ = fetch_csv_files(find_new_csv_files(), PIPELINE_COLUMNS)
+    return data
+
+# Function to map a column to the SQLite type it is stored as in the raw store
+def _raw_store_type(col: str, data: pd.DataFrame):
+    if col in CSV_STRING_COLUMNS:
+        return "TEXT"
+    if col in data.columns and pd.api.types.is_integer_dtype(data[col]):
+        return "INTEGER"
+    return "REAL"
+
+# Function to append ingested CSV records to the raw store
+def save_to_raw_store(data: pd.DataFrame, store_path: str = None):
+    """
+    Appends newly ingested CSV records to the raw store, a SQLite table holding every CSV batch ingested so far,
+    so that later runs still see the records of files the manifest now skips. The store also holds the
+    deduplication index: the keys of the saved records are committed in the same transaction, and records whose
+    key is already indexed are skipped, so saving the same batch again (e.g. after an interrupted run) does not
+    duplicate it.
+    
+    Parameters:
+    data (pd.DataFrame): The ingested records.
+    store_path (str): The path to the raw store database (defaults to RAW_STORE_PATH).
+    
+    Returns:
+    int: The number of records added.
+    """
+    if data.empty:
+        return 0
+    store_path = store_path or RAW_STORE_PATH
+    columns = [col for col in PIPELINE_COLUMNS if col in data.columns]
+    
+    conn = open_hash_index(store_path)
+    try:
+        declared = ", ".join(f'"{col}" {_raw_store_type(col, data)}' for col in PIPELINE_COLUMNS)
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{SQL_TABLE_NAME}" ({declared})')
+        
+        # Keep the first record of each key that is not indexed yet, and every record without a complete key
+        keep = np.ones(len(data), dtype=bool)
+        new_hashes = np.zeros(0, dtype=np.int64)
+        if all(col in data.columns for col in DEDUP_KEY_COLUMNS):
+            has_key = data[DEDUP_KEY_COLUMNS].notna().all(axis=1).to_numpy()
+            hashes = hash_record_keys(data)
+            indexed = lookup_indexed_hashes(conn, hashes[has_key])
+            is_new = has_key & ~pd.Series(hashes).duplicated().to_numpy() & ~np.isin(hashes, indexed)
+            keep = is_new | ~has_key
+            new_hashes = hashes[is_new]
+        
+        values = data.loc[keep, columns].astype(object)
+        values = values.where(values.notna(), None)
+        column_list = ", ".join(f'"{col}"' for col in columns)
+        placeholders = ", ".join("?" for _ in columns)
+        conn.executemany(f'INSERT INTO "{SQL_TABLE_NAME}" ({column_list}) VALUES ({placeholders})',
+                         values.itertuples(index=False, name=None))
+        
+        # Commit the records together with their keys
+        commit_keys(new_hashes, conn=conn)
+    finally:
+        conn.close()
+    added = int(keep.sum())
+    print(f"Saved {added} new CSV record(s) to the raw store.")
+    return added
+
+# Function to read every ingested CSV record from the raw store
+def fetch_data_from_raw_store(store_path: str = None):
+    """
+    Reads the full history of ingested CSV records from the raw store.
+    
+    Parameters:
+    store_path (str): The path to the raw store database (defaults to RAW_STORE_PATH).
+    
+    Returns:
+    pd.DataFrame: The ingested CSV records, with the pipeline columns.
+    """
+    store_path = store_path or RAW_STORE_PATH
+    if not os.path.exists(store_path):
+        return pd.DataFrame()
+    try:
+        available_columns = set(get_table_columns(SQL_TABLE_NAME, store_path))
+        columns = [col for col in PIPELINE_COLUMNS if col in available_columns]
+        if not columns:
+            return pd.DataFrame()
+        query, params = build_sql_query(columns=columns)
+        with pooled_connection(store_path) as conn:
+            data = pd.read_sql(query, conn, params=params)
+        print(f"Loaded {len(data)} previously ingested CSV record(s) from the raw store.")
+        return data
+    except Exception as e:
+        print(f"Error reading the raw store {store_path}: {e}")
+        return pd.DataFrame()
+
+# Function to fetch the keys of the SQL rows a batch of CSV records may duplicate
+def fetch_sql_keys(data: pd.DataFrame, db_path: str = None):
+    """
+    Reads the key columns of the SQL rows on the same vehicles and dates as the given records, through the
+    (vehicle_id, date) index, so a new CSV batch is checked against SQL without reading the whole table.
+    Only rows from SQL_START_DATE onwards are read, as those are the rows collect_data fetches.
+    
+    Parameters:
+    data (pd.DataFrame): The new CSV records.
+    db_path (str): The path to the SQLite database file (defaults to SQL_DATABASE_PATH).
     
     Returns:
-    pd.DataFrame: A Pandas DataFrame containing the data from the CSV file.
+    pd.DataFrame: The key columns of the matching SQL rows.
     """
+    db_path = db_path or SQL_DATABASE_PATH
+    lookup_columns = ["vehicle_id", "date"]
+    if data.empty or not os.path.exists(db_path) or any(col not in data.columns for col in lookup_columns):
+        return pd.DataFrame()
     try:
-        # Check if the file exists
-        if os.path.exists(CSV_FILE_PATH):
-            data = pd.read_csv(CSV_FILE_PATH)
-            print("Data successfully loaded from CSV file.")
-            return data
-        else:
-            print(f"Error: CSV file not found at {CSV_FILE_PATH}")
+        if any(col not in get_table_columns(SQL_TABLE_NAME, db_path) for col in lookup_columns + DEDUP_KEY_COLUMNS):
             return pd.DataFrame()
+        pairs = data[lookup_columns].dropna().drop_duplicates().astype(object)
+        pairs = pairs[pairs["date"] >= SQL_START_DATE] if SQL_START_DATE else pairs
+        key_list = ", ".join(f'sql_rows."{col}"' for col in DEDUP_KEY_COLUMNS)
+        with pooled_connection(db_path) as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS batch_days (vehicle_id, date)")
+            conn.execute("DELETE FROM temp.batch_days")
+            conn.executemany("INSERT INTO temp.batch_days VALUES (?, ?)", pairs.itertuples(index=False, name=None))
+            keys = pd.read_sql(
+                f'SELECT {key_list} FROM temp.batch_days AS days '
+                f'JOIN "{SQL_TABLE_NAME}" AS sql_rows ON sql_rows.vehicle_id = days.vehicle_id AND sql_rows.date = days.date',
+                conn,
+            )
+            conn.execute("DELETE FROM temp.batch_days")
+        return keys
     except Exception as e:
-        print(f"Error reading CSV file: {e}")
+        print(f"Error looking up the SQL keys of the new CSV records: {e}")
         return pd.DataFrame()
 
+# Function to read the new CSV drops without recording them as ingested
+def read_new_csv_batch():
+    """
+    Reads the CSV files that have not been ingested yet and drops the records already ingested in earlier
+    batches or already present in SQL (SQL rows take precedence). Nothing is recorded: pass the result to
+    commit_ingested_batch once it has been used successfully.
+    
+    Returns:
+    tuple: The new records and the list of CSV files read.
+    """
+    csv_data, ingested_files = fetch_csv_files(find_new_csv_files(), PIPELINE_COLUMNS)
+    csv_data, _ = deduplicate_records(csv_data, known_data=fetch_sql_keys(csv_data), index_path=RAW_STORE_PATH)
+    return csv_data, ingested_files
+
+# Function to record a batch of new CSV records as ingested
+def commit_ingested_batch(data: pd.DataFrame, file_paths: list):
+    """
+    Saves a batch read by read_new_csv_batch to the raw store, together with its keys, then records its files in
+    the manifest. Nothing is recorded until the records are saved, so a run that fails earlier ingests the same
+    batch again.
+    
+    Parameters:
+    data (pd.DataFrame): The new records.
+    file_paths (list): The CSV files the records were read from.
+    
+    Returns:
+    int: The number of records added to the raw store.
+    """
+    added = save_to_raw_store(data)
+    mark_files_ingested(file_paths)
+    return added
+
+# Function to ingest the new CSV drops into the raw store
+def ingest_new_csv_files():
+    """
+    Reads the CSV files that have not been ingested yet, drops the records already ingested in earlier batches or
+    present in SQL, appends the rest to the raw store and records the files in the manifest. The manifest and deduplication
+    state only decide which records are new; the raw store keeps all of them.
+    
+    Returns:
+    int: The number of records added to the raw store.
+    """
+    return commit_ingested_batch(*read_new_csv_batch())
+
+# Function to fetch the SQL source with column projection
+def _fetch_sql_source():
+    # Build the SQL query, projecting only the columns the downstream stages use
+    try:
+        available_columns = set(get_table_columns(SQL_TABLE_NAME, SQL_DATABASE_PATH))
+        columns = [col for col in PIPELINE_COLUMNS if col in available_columns] or None
+    except Exception as e:
+        print(f"Error inspecting SQL table columns: {e}")
+        columns = None
+    query, params = build_sql_query(columns=columns, start_date=SQL_START_DATE)
+    return fetch_data_from_sql(query, params)
+
 # Main function to collect data
 def collect_data():
     """
-    Collects data from multiple sources (SQL database and CSV file) and merges them for further processing.
+    Collects data from multiple sources (SQL database and CSV files) and merges them for further processing.
+    The SQL query runs on a background thread while the new CSV files are ingested into the raw store, and the
+    full CSV history is then read back from the raw store, so every run sees all records ingested so far.
+    CSV records duplicating SQL rows or earlier batches were dropped when they were ingested, so the sources are
+    merged as they are.
     
     Returns:
     pd.DataFrame: A DataFrame containing all the collected data from different sources.
     """
-    # Define the SQL query to fetch vehicle telematics data
-    query = "SELECT * FROM vehicle_performance WHERE date >= '2023-01-01'"
-    
-    # Fetch data from SQL
-    sql_data = fetch_data_from_sql(query)
-    
-    # Fetch data from CSV file
-    csv_data = fetch_data_from_csv()
+    # Fetch data from SQL in the background while the new CSV files are ingested
+    with ThreadPoolExecutor(max_workers=1) as sql_executor:
+        sql_future = sql_executor.submit(_fetch_sql_source)
+        ingest_new_csv_files()
+        csv_data = fetch_data_from_raw_store()
+        sql_data = sql_future.result()
     
     # Merge the SQL and CSV data (if both exist)
     if not sql_data.empty and not csv_data.empty:
@@ -0,0 +1,330 @@
+# deduplication.py
+# This script removes duplicate telematics records before the SQL and CSV data are merged.
+# Records are keyed on (vehicle_id, timestamp). Keys of previously ingested CSV records are kept in a hash index
+# inside the raw store, fronted by a Bloom filter, so each new batch is deduplicated without rescanning the
+# ingestion history.
+
+import math
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from config import (DEDUP_KEY_COLUMNS, BLOOM_FILTER_CAPACITY, BLOOM_FILTER_ERROR_RATE, SQLITE_JOURNAL_MODE,
+                    SQLITE_MMAP_SIZE, RAW_STORE_PATH)
+
+# Define the path to the Bloom filter (the hash index itself lives in the raw store database)
+BLOOM_FILTER_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/dedup_bloom.npz"
+
+# Number of keys looked up or inserted per SQLite statement batch
+INDEX_BATCH_SIZE = 100000
+
+# Function to normalize a key column so equal keys hash equally regardless of the source dtype
+def _normalize_key_column(series: pd.Series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime("%Y-%m-%d %H:%M:%S")
+    if pd.api.types.is_float_dtype(series):
+        finite = series.dropna()
+        if (finite == finite.round()).all():
+            # Integer ids read as floats (e.g. because of missing values) should match their integer form
+            series = series.astype("Int64")
+    return series.astype(str)
+
+# Function to hash the record keys
+def hash_record_keys(data: pd.DataFrame, key_columns: list = None):
+    """
+    Computes a 64-bit hash of the key columns of every row.
+    
+    Parameters:
+    data (pd.DataFrame): The records to hash.
+    key_columns (list): The columns identifying a record (defaults to DEDUP_KEY_COLUMNS).
+    
+    Returns:
+    np.ndarray: The signed 64-bit hash of each row's key, in row order.
+    """
+    key_columns = key_columns or DEDUP_KEY_COLUMNS
+    keys = pd.DataFrame({col: _normalize_key_column(data[col]) for col in key_columns})
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    # SQLite stores signed 64-bit integers
+    return hashes.view(np.int64)
+
+# Function to create an empty Bloom filter
+def create_bloom_filter(capacity: int = BLOOM_FILTER_CAPACITY, error_rate: float = BLOOM_FILTER_ERROR_RATE):
+    """
+    Creates an empty Bloom filter sized for the given number of keys and false positive rate.
+    
+    Parameters:
+    capacity (int): The number of keys the filter is expected to hold.
+    error_rate (float): The target false positive rate at that capacity.
+    
+    Returns:
+    dict: The filter's bit array, number of hash functions and number of keys added.
+    """
+    num_bits = max(64, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+    num_bits = (num_bits + 7) // 8 * 8
+    num_hashes = max(1, int(round(num_bits / capacity * math.log(2))))
+    return {"bits": np.zeros(num_bits // 8, dtype=np.uint8), "num_hashes": num_hashes, "key_count": 0}
+
+# Function to compute the bit positions of the given hashes (double hashing)
+def _bloom_positions(bloom: dict, hashes: np.ndarray):
+    hashes = hashes.view(np.uint64)
+    h1 = hashes & np.uint64(0xFFFFFFFF)
+    h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+    rounds = np.arange(bloom["num_hashes"], dtype=np.uint64)
+    return (h1[:, None] + rounds[None, :] * h2[:, None]) % np.uint64(bloom["bits"].size * 8)
+
+# Function to test hashes against a Bloom filter
+def bloom_contains(bloom: dict, hashes: np.ndarray):
+    """
+    Tests which hashes may have been added to the filter. False means the key was definitely never added.
+    
+    Parameters:
+    bloom (dict): The Bloom filter.
+    hashes (np.ndarray): The key hashes to test.
+    
+    Returns:
+    np.ndarray: A boolean array, True where the key may be present.
+    """
+    if hashes.size == 0:
+        return np.zeros(0, dtype=bool)
+    positions = _bloom_positions(bloom, hashes)
+    bits = bloom["bits"][positions >> np.uint64(3)] & (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8))
+    return (bits != 0).all(axis=1)
+
+# Function to add hashes to a Bloom filter
+def bloom_add(bloom: dict, hashes: np.ndarray):
+    """
+    Adds the given key hashes to the filter in place.
+    
+    Parameters:
+    bloom (dict): The Bloom filter.
+    hashes (np.ndarray): The key hashes to add.
+    """
+    if hashes.size == 0:
+        return
+    positions = _bloom_positions(bloom, hashes).ravel()
+    masks = np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)
+    np.bitwise_or.at(bloom["bits"], positions >> np.uint64(3), masks)
+    bloom["key_count"] += int(hashes.size)
+
+# Function to save a Bloom filter to disk
+def save_bloom_filter(bloom: dict, file_path: str = None):
+    """
+    Saves the Bloom filter, replacing the previous file atomically.
+    
+    Parameters:
+    bloom (dict): The Bloom filter to save.
+    file_path (str): The destination path (defaults to BLOOM_FILTER_PATH).
+    """
+    file_path = file_path or BLOOM_FILTER_PATH
+    tmp_path = file_path + ".tmp.npz"
+    np.savez(tmp_path, bits=bloom["bits"], num_hashes=bloom["num_hashes"], key_count=bloom["key_count"])
+    os.replace(tmp_path, file_path)
+
+# Function to load a Bloom filter from disk
+def load_bloom_filter(file_path: str = None):
+    """
+    Loads a Bloom filter saved with save_bloom_filter.
+    
+    Parameters:
+    file_path (str): The path of the saved filter (defaults to BLOOM_FILTER_PATH).
+    
+    Returns:
+    dict: The Bloom filter, or None if the file does not exist or cannot be read.
+    """
+    file_path = file_path or BLOOM_FILTER_PATH
+    try:
+        with np.load(file_path) as saved:
+            return {"bits": saved["bits"].copy(), "num_hashes": int(saved["num_hashes"]),
+                    "key_count": int(saved["key_count"])}
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error loading Bloom filter from {file_path}: {e}")
+        return None
+
+# Function to open the persistent hash index
+def open_hash_index(index_path: str = None):
+    """
+    Opens the database holding the hashes of all ingested record keys, creating the index tables if needed.
+    The index is kept in the raw store, so records and their keys are saved in the same transaction.
+    
+    Parameters:
+    index_path (str): The path to the index database (defaults to RAW_STORE_PATH).
+    
+    Returns:
+    sqlite3.Connection: A connection to the index database.
+    """
+    conn = sqlite3.connect(index_path or RAW_STORE_PATH)
+    conn.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+    conn.execute(f"PRAGMA mmap_size = {int(SQLITE_MMAP_SIZE)}")
+    conn.execute("CREATE TABLE IF NOT EXISTS record_keys (key_hash INTEGER PRIMARY KEY) WITHOUT ROWID")
+    conn.execute("CREATE TABLE IF NOT EXISTS index_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO index_meta VALUES ('key_count', 0)")
+    conn.commit()
+    return conn
+
+# Function to rebuild the Bloom filter from the hash index
+def rebuild_bloom_filter(conn: sqlite3.Connection):
+    """
+    Rebuilds the Bloom filter from every key hash in the index. This is only needed when the saved filter
+    is missing or out of date with the index, e.g. after an interrupted run.
+    
+    Parameters:
+    conn (sqlite3.Connection): A connection to the index database.
+    
+    Returns:
+    dict: The rebuilt Bloom filter.
+    """
+    key_count = conn.execute("SELECT value FROM index_meta WHERE name = 'key_count'").fetchone()[0]
+    bloom = create_bloom_filter(max(BLOOM_FILTER_CAPACITY, key_count * 2))
+    cursor = conn.execute("SELECT key_hash FROM record_keys")
+    while True:
+        rows = cursor.fetchmany(INDEX_BATCH_SIZE)
+        if not rows:
+            break
+        bloom_add(bloom, np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)))
+    print(f"Bloom filter rebuilt from {bloom['key_count']} indexed keys.")
+    return bloom
+
+# Function to load the Bloom filter, rebuilding it if it does not match the index
+def _load_consistent_bloom_filter(conn: sqlite3.Connection, bloom_path: str):
+    key_count = conn.execute("SELECT value FROM index_meta WHERE name = 'key_count'").fetchone()[0]
+    bloom = load_bloom_filter(bloom_path)
+    if bloom is None or bloom["key_count"] != key_count:
+        bloom = rebuild_bloom_filter(conn)
+        save_bloom_filter(bloom, bloom_path)
+    elif key_count > BLOOM_FILTER_CAPACITY:
+        print("Warning: Bloom filter is over capacity; more keys will need an index lookup.")
+    return bloom
+
+# Function to look up which hashes are already in the index
+def lookup_indexed_hashes(conn: sqlite3.Connection, hashes: np.ndarray):
+    """
+    Looks the given key hashes up in the index, without going through the Bloom filter.
+    
+    Parameters:
+    conn (sqlite3.Connection): A connection to the index database.
+    hashes (np.ndarray): The key hashes to look up.
+    
+    Returns:
+    np.ndarray: The hashes that are already in the index.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS candidate_keys (key_hash INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM candidate_keys")
+    for start in range(0, hashes.size, INDEX_BATCH_SIZE):
+        batch = hashes[start:start + INDEX_BATCH_SIZE].tolist()
+        conn.executemany("INSERT OR IGNORE INTO candidate_keys VALUES (?)", ((h,) for h in batch))
+    found = conn.execute(
+        "SELECT key_hash FROM candidate_keys JOIN record_keys USING (key_hash)"
+    ).fetchall()
+    conn.execute("DELETE FROM candidate_keys")
+    return np.array([row[0] for row in found], dtype=np.int64)
+
+# Function to add new hashes to the index
+def _insert_hashes(conn: sqlite3.Connection, hashes: np.ndarray):
+    for start in range(0, hashes.size, INDEX_BATCH_SIZE):
+        batch = hashes[start:start + INDEX_BATCH_SIZE].tolist()
+        conn.executemany("INSERT OR IGNORE INTO record_keys VALUES (?)", ((h,) for h in batch))
+    conn.execute("UPDATE index_meta SET value = value + ? WHERE name = 'key_count'", (int(hashes.size),))
+
+# Main function to deduplicate a batch of records
+def deduplicate_records(data: pd.DataFrame, known_data: pd.DataFrame = None, check_index: bool = True,
+                        key_columns: list = None, index_path: str = None, bloom_path: str = None):
+    """
+    Removes records whose (vehicle_id, timestamp) key appears earlier in the batch, in known_data, or
+    (when check_index is True) in the persistent index of previously ingested records. Only batch keys that
+    the Bloom filter cannot rule out are looked up in the index, so the cost is proportional to the batch
+    rather than the history. Rows with a missing key are kept.
+    The index is only read here: once the kept records have been saved, the caller records their keys
+    with commit_keys, so a batch that fails before it is saved can be ingested again.
+    
+    Parameters:
+    data (pd.DataFrame): The new batch of records.
+    known_data (pd.DataFrame): Records from another source that take precedence (e.g. the SQL rows on the
+        batch's vehicles and dates).
+    check_index (bool): Whether to check the persistent index.
+    key_columns (list): The columns identifying a record (defaults to DEDUP_KEY_COLUMNS).
+    index_path (str): The path to the index database (defaults to RAW_STORE_PATH).
+    bloom_path (str): The path to the Bloom filter file (defaults to BLOOM_FILTER_PATH).
+    
+    Returns:
+    tuple: The deduplicated DataFrame and the number of records removed.
+    """
+    key_columns = key_columns or DEDUP_KEY_COLUMNS
+    if data.empty:
+        return data, 0
+    missing_columns = [col for col in key_columns if col not in data.columns]
+    if missing_columns:
+        print(f"Skipping deduplication: key column(s) {missing_columns} not found.")
+        return data, 0
+    
+    has_key = data[key_columns].notna().all(axis=1).to_numpy()
+    hashes = hash_record_keys(data, key_columns)
+    
+    # Keep the first occurrence of each key within the batch
+    keep = has_key & ~pd.Series(hashes).duplicated().to_numpy()
+    
+    # Drop keys already collected from another source in this run
+    if known_data is not None and not known_data.empty and all(col in known_data.columns for col in key_columns):
+        known_hashes = hash_record_keys(known_data, key_columns)
+        keep &= ~pd.Series(hashes).isin(known_hashes).to_numpy()
+    
+    if check_index and os.path.exists(index_path or RAW_STORE_PATH):
+        conn = open_hash_index(index_path)
+        try:
+            bloom = _load_consistent_bloom_filter(conn, bloom_path or BLOOM_FILTER_PATH)
+            
+            # Only keys the Bloom filter may have seen need an index lookup
+            maybe_seen = np.zeros(hashes.size, dtype=bool)
+            maybe_seen[keep] = bloom_contains(bloom, hashes[keep])
+            if maybe_seen.any():
+                indexed = lookup_indexed_hashes(conn, hashes[maybe_seen])
+                keep &= ~(maybe_seen & pd.Series(hashes).isin(indexed).to_numpy())
+        finally:
+            conn.close()
+    
+    keep |= ~has_key
+    removed = int(len(data) - keep.sum())
+    print(f"Removed {removed} duplicate record(s) out of {len(data)}.")
+    return data[keep].reset_index(drop=True), removed
+
+# Function to record the keys of a saved batch
+def commit_keys(hashes: np.ndarray, index_path: str = None, bloom_path: str = None,
+                conn: sqlite3.Connection = None):
+    """
+    Records key hashes in the persistent index and the Bloom filter, so later batches treat these records
+    as already ingested. When conn is given, the keys are written through it and committed together with
+    whatever the caller has written in the same transaction (e.g. the records themselves). Hashes already
+    in the index are skipped, so committing the same batch twice is harmless.
+    
+    Parameters:
+    hashes (np.ndarray): The key hashes of the saved records.
+    index_path (str): The path to the index database (defaults to RAW_STORE_PATH).
+    bloom_path (str): The path to the Bloom filter file (defaults to BLOOM_FILTER_PATH).
+    conn (sqlite3.Connection): An open connection to the index database (see open_hash_index).
+    
+    Returns:
+    int: The number of keys added to the index.
+    """
+    hashes = np.unique(np.asarray(hashes, dtype=np.int64))
+    if hashes.size == 0:
+        if conn is not None:
+            conn.commit()
+        return 0
+    owns_connection = conn is None
+    conn = conn or open_hash_index(index_path)
+    try:
+        bloom_path = bloom_path or BLOOM_FILTER_PATH
+        bloom = _load_consistent_bloom_filter(conn, bloom_path)
+        new_hashes = hashes[~np.isin(hashes, lookup_indexed_hashes(conn, hashes))]
+        
+        # Record the new keys in the index first, then in the Bloom filter
+        _insert_hashes(conn, new_hashes)
+        conn.commit()
+        bloom_add(bloom, new_hashes)
+        save_bloom_filter(bloom, bloom_path)
+    finally:
+        if owns_connection:
+            conn.close()
+    print(f"Recorded {new_hashes.size} new record key(s) in the deduplication index.")
+    return int(new_hashes.size)
@@ -0,0 +1,737 @@
+# distributed_pipeline.py
+# This script runs the cleaning and feature engineering stages as shards spread over several worker processes.
+# The coordinator splits the fleet into vehicle_id (and optionally date) shards and publishes them to a durable SQLite
+# work queue; workers on this or other hosts sharing the filesystem claim shards, process them, and commit their outputs
+# idempotently. Each shard is processed in phases: between phases the coordinator combines the statistics reported by
+# every shard (medians, means and standard deviations), so the cleaned data does not depend on the shard layout.
+# The coordinator then merges the shard outputs per vehicle range, refreshes the feature store, and retrains the model.
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import sqlite3
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import data_collection
+from data_collection import build_sql_query, pooled_connection, get_table_columns, read_new_csv_batch, commit_ingested_batch
+from data_cleaning import handle_missing_values, remove_outliers, standardize_data, NON_FEATURE_COLUMNS
+from feature_engineering import create_fuel_efficiency_per_trip, calculate_idle_time, create_maintenance_critical_metrics
+from dashboard_export import prepare_data_for_export
+from feature_store import update_feature_store
+from config import (SQL_TABLE_NAME, SQL_START_DATE, PIPELINE_COLUMNS, DISTRIBUTED_WORKERS, DISTRIBUTED_VEHICLE_SHARDS,
+                    DISTRIBUTED_SHARD_DAYS, SHARD_LEASE_SECONDS, MAX_SHARD_ATTEMPTS, WORK_QUEUE_DIRECTORY)
+
+# Define paths for the merged outputs
+PROCESSED_DATA_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/processed_data.csv"
+EXPORT_FILE_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/dashboard_export.csv"
+
+# Seconds between polls of the queue while waiting for shards
+POLL_INTERVAL = 1.0
+
+# Phases every shard goes through, in order. After each of the first three the coordinator combines the shard
+# outputs into global statistics: the medians used for imputation, the moments of the imputed data used by the
+# Z-score filter, and the moments of the filtered data used for standardization.
+PHASES = ["collect", "imputed_moments", "filtered_moments", "engineer"]
+
+# Function to open the work queue
+def open_queue(queue_path: str = None):
+    """
+    Opens (and creates if needed) the SQLite work queue. Transactions are managed explicitly so that
+    claiming a shard is atomic across processes and hosts. The queue uses the rollback journal, which only
+    relies on file locks; WAL needs shared memory and does not work for workers on other hosts.
+    
+    Parameters:
+    queue_path (str): The path to the queue database (defaults to work_queue.db in WORK_QUEUE_DIRECTORY).
+    
+    Returns:
+    sqlite3.Connection: A connection to the work queue.
+    """
+    queue_path = queue_path or os.path.join(WORK_QUEUE_DIRECTORY, "work_queue.db")
+    conn = sqlite3.connect(queue_path, timeout=60, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.execute("PRAGMA busy_timeout = 60000")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY, created_at TEXT, sql_database_path TEXT, raw_store_path TEXT, staging_path TEXT,
+            output_dir TEXT, status TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS shards (
+            shard_id TEXT PRIMARY KEY, run_id TEXT, phase TEXT, shard_index INTEGER, vehicle_min, vehicle_max,
+            start_date TEXT, end_date TEXT, status TEXT DEFAULT 'pending', worker TEXT, lease_expires REAL,
+            attempts INTEGER DEFAULT 0, rows INTEGER, error TEXT, updated_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_shards_run_status ON shards (run_id, status)")
+    return conn
+
+# Function to load new CSV drops into the run's staging database
+def stage_csv_drops(staging_path: str):
+    """
+    Reads the CSV drops not ingested yet, drops records already seen in earlier batches, and writes the rest to
+    an indexed staging database that workers query with the same shard filters as the SQL database.
+    Nothing is recorded as ingested here; the coordinator commits the batch once the run has been merged.
+    
+    Parameters:
+    staging_path (str): The path of the staging database to create.
+    
+    Returns:
+    tuple: The staged rows and the list of CSV files read.
+    """
+    csv_data, ingested_files = read_new_csv_batch()
+    if csv_data.empty:
+        return csv_data, ingested_files
+    
+    conn = sqlite3.connect(staging_path)
+    try:
+        csv_data.to_sql(SQL_TABLE_NAME, conn, if_exists="replace", index=False)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"Staged {len(csv_data)} CSV rows for the shard workers.")
+    return csv_data, ingested_files
+
+# Function to compute the shard boundaries
+def plan_shards(sources: list, num_vehicle_shards: int, shard_days: int = None):
+    """
+    Splits the vehicles found in the given databases into contiguous vehicle_id ranges of similar size, and
+    optionally splits the history into date ranges of shard_days days. The first date range has no lower bound
+    and the last no upper bound, so every record of a vehicle falls into exactly one shard.
+    
+    Parameters:
+    sources (list): (db_path, start_date) pairs for the databases holding the data to process; start_date is the
+                    inclusive lower bound on the dates read from that database, or None to read every date.
+    num_vehicle_shards (int): The number of vehicle ranges.
+    shard_days (int): The length of the date ranges, or None to process the full history in each shard.
+    
+    Returns:
+    list: (vehicle_min, vehicle_max, start_date, end_date) tuples; end_date is exclusive and either date may be None.
+    """
+    vehicle_ids, dates = set(), []
+    for db_path, start_date in sources:
+        if not db_path or not os.path.exists(db_path):
+            continue
+        condition, params = ("WHERE date >= ?", (start_date,)) if start_date else ("", ())
+        with pooled_connection(db_path) as conn:
+            vehicle_ids.update(row[0] for row in conn.execute(
+                f'SELECT DISTINCT vehicle_id FROM "{SQL_TABLE_NAME}" {condition}', params))
+            if shard_days:
+                dates.extend(conn.execute(
+                    f'SELECT min(date), max(date) FROM "{SQL_TABLE_NAME}" {condition}', params).fetchone())
+    vehicle_ids.discard(None)
+    if not vehicle_ids:
+        return []
+    
+    vehicle_ranges = [(chunk[0], chunk[-1]) for chunk in
+                      np.array_split(np.array(sorted(vehicle_ids), dtype=object), min(num_vehicle_shards, len(vehicle_ids)))]
+    date_ranges = [(None, None)]
+    dates = [date for date in dates if date is not None]
+    if shard_days and dates:
+        start = datetime.fromisoformat(str(min(dates))[:10])
+        last = datetime.fromisoformat(str(max(dates))[:10])
+        date_ranges = []
+        while start <= last:
+            end = start + timedelta(days=shard_days)
+            date_ranges.append((start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")))
+            start = end
+        date_ranges[0] = (None, date_ranges[0][1])
+        date_ranges[-1] = (date_ranges[-1][0], None)
+    
+    return [(vmin, vmax, start_date, end_date) for vmin, vmax in vehicle_ranges for start_date, end_date in date_ranges]
+
+# Function to publish a run to the queue
+def publish_run(conn: sqlite3.Connection, run_id: str, staging_path: str, output_dir: str):
+    """
+    Records a run in the work queue, together with the databases its shards read. Raises sqlite3.IntegrityError
+    if a run with the same id already exists, rather than attaching to that run and its finished shards.
+    
+    Parameters:
+    conn (sqlite3.Connection): A connection to the work queue.
+    run_id (str): The id of the run.
+    staging_path (str): The staging database holding the run's new CSV rows.
+    output_dir (str): The directory receiving the shard outputs and the run's statistics.
+    """
+    conn.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, 'running')",
+                 (run_id, datetime.now().isoformat(timespec="seconds"), os.path.abspath(data_collection.SQL_DATABASE_PATH),
+                  os.path.abspath(data_collection.RAW_STORE_PATH), staging_path, output_dir))
+    print(f"Published run {run_id}.")
+
+# Function to publish one phase of a run's shards to the queue
+def publish_phase(conn: sqlite3.Connection, run_id: str, phase: str, shards: list):
+    """
+    Queues one task per shard for a phase of the run. Task ids are derived from the run id, phase and shard
+    position; publishing tasks that already exist raises sqlite3.IntegrityError.
+    
+    Parameters:
+    conn (sqlite3.Connection): A connection to the work queue.
+    run_id (str): The id of the run.
+    phase (str): The phase to queue, one of PHASES.
+    shards (list): The shard boundaries, as returned by plan_shards.
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "INSERT INTO shards (shard_id, run_id, phase, shard_index, vehicle_min, vehicle_max, start_date, "
+            "end_date, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(f"{run_id}:{phase}:{i:05d}", run_id, phase, i, vmin.item() if hasattr(vmin, "item") else vmin,
+              vmax.item() if hasattr(vmax, "item") else vmax, start_date, end_date, now)
+             for i, (vmin, vmax, start_date, end_date) in enumerate(shards)],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    print(f"Published phase {phase} of run {run_id} with {len(shards)} shards.")
+
+# Function to claim the next available shard
+def claim_shard(conn: sqlite3.Connection, run_id: str, worker: str):
+    """
+    Atomically claims a pending shard, or a running shard whose lease has expired (its worker is presumed dead).
+    
+    Parameters:
+    conn (sqlite3.Connection): A connection to the work queue.
+    run_id (str): The run to claim a shard from.
+    worker (str): The name of the claiming worker.
+    
+    Returns:
+    dict: The claimed shard, or None if no shard is available.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = conn.execute(
+            "SELECT * FROM shards WHERE run_id = ? AND (status = 'pending' OR (status = 'running' AND lease_expires < ?)) "
+            "ORDER BY shard_id LIMIT 1", (run_id, now))
+        row = cursor.fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        shard = dict(zip([column[0] for column in cursor.description], row))
+        conn.execute(
+            "UPDATE shards SET status = 'running', worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+            "WHERE shard_id = ?",
+            (worker, now + SHARD_LEASE_SECONDS, datetime.now().isoformat(timespec="seconds"), shard["shard_id"]))
+        conn.execute("COMMIT")
+        return shard
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+# Function to read one shard's rows from a database
+def _read_shard_rows(db_path: str, shard: dict, start_date: str = None, include_undated: bool = False):
+    if not db_path or not os.path.exists(db_path):
+        return pd.DataFrame()
+    available_columns = set(get_table_columns(SQL_TABLE_NAME, db_path))
+    columns = [col for col in PIPELINE_COLUMNS if col in available_columns]
+    if not columns:
+        return pd.DataFrame()
+    vehicle_id_range = (shard["vehicle_min"], shard["vehicle_max"])
+    query, params = build_sql_query(columns=columns, start_date=start_date, end_date=shard["end_date"],
+                                    vehicle_id_range=vehicle_id_range)
+    with pooled_connection(db_path) as conn:
+        data = pd.read_sql(query, conn, params=params)
+        if include_undated and shard["end_date"] is not None:
+            # Records without a date do not match any date range; the first date range picks them up
+            query, params = build_sql_query(columns=columns, vehicle_id_range=vehicle_id_range)
+            undated = pd.read_sql(query + " AND date IS NULL", conn, params=params)
+            if not undated.empty:
+                data = pd.concat([data, undated], ignore_index=True)
+    return data
+
+# Function to write a shard output atomically
+def _write_atomic(data, file_path: str):
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    if isinstance(data, pd.DataFrame) and file_path.endswith(".pkl"):
+        data.to_pickle(tmp_path)
+    elif isinstance(data, pd.DataFrame):
+        data.to_csv(tmp_path, index=False)
+    elif isinstance(data, np.ndarray):
+        with open(tmp_path, "wb") as f:
+            np.save(f, data)
+    else:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+    os.replace(tmp_path, file_path)
+
+# Function to build the path of a shard output
+def _shard_path(run: dict, phase: str, shard_index: int, suffix: str):
+    return os.path.join(run["output_dir"], phase, f"{shard_index:05d}{suffix}")
+
+# Function to load the global statistics of a run
+def _load_statistics(run: dict):
+    with open(os.path.join(run["output_dir"], "statistics.json"), "r") as f:
+        return json.load(f)
+
+# Function to collect the records of one shard
+def collect_shard(shard: dict, run: dict):
+    """
+    Reads the shard's records from the SQL database, the raw store and the staging database (CSV records
+    duplicating SQL rows or earlier batches were dropped when they were staged) and saves them for the later phases together with the sorted values of every numeric column, from which the
+    coordinator computes the exact global medians.
+    
+    Parameters:
+    shard (dict): The shard, as returned by claim_shard.
+    run (dict): The run the shard belongs to.
+    
+    Returns:
+    int: The number of records collected.
+    """
+    # SQL rows are limited to SQL_START_DATE onwards; ingested CSV rows are read whatever their date
+    start_date = shard["start_date"]
+    sql_data = _read_shard_rows(run["sql_database_path"], shard, max(start_date, SQL_START_DATE) if start_date else SQL_START_DATE)
+    csv_frames = [_read_shard_rows(db_path, shard, start_date, include_undated=start_date is None)
+                  for db_path in (run["raw_store_path"], run["staging_path"])]
+    csv_frames = [frame for frame in csv_frames if not frame.empty]
+    csv_data = pd.concat(csv_frames, ignore_index=True) if csv_frames else pd.DataFrame()
+    frames = [frame for frame in (sql_data, csv_data) if not frame.empty]
+    data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    
+    column_kinds = {}
+    for col in data.columns:
+        if not data[col].notna().any():
+            column_kinds[col] = None
+        elif pd.api.types.is_numeric_dtype(data[col]):
+            column_kinds[col] = "numeric"
+            values = np.sort(data[col].dropna().to_numpy(dtype=np.float64))
+            _write_atomic(values, _shard_path(run, "collect", shard["shard_index"], f".{col}.npy"))
+        else:
+            column_kinds[col] = "object"
+    _write_atomic(data, _shard_path(run, "collect", shard["shard_index"], ".pkl"))
+    _write_atomic({"columns": column_kinds, "rows": len(data)}, _shard_path(run, "collect", shard["shard_index"], ".json"))
+    return len(data)
+
+# Function to clean the collected records of one shard with the global statistics
+def clean_shard(shard: dict, run: dict, statistics: dict, phase: str):
+    """
+    Loads the collected records of a shard and applies the cleaning steps whose global statistics are used in
+    the given phase: median imputation, then the Z-score filter, then standardization.
+    
+    Parameters:
+    shard (dict): The shard, as returned by claim_shard.
+    run (dict): The run the shard belongs to.
+    statistics (dict): The global statistics of the run.
+    phase (str): The phase being processed.
+    
+    Returns:
+    pd.DataFrame: The cleaned records of the shard.
+    """
+    data = pd.read_pickle(_shard_path(run, "collect", shard["shard_index"], ".pkl"))
+    
+    # Give every shard the columns and column types of the whole dataset
+    data = data.reindex(columns=statistics["columns"])
+    for col in data.columns:
+        if col in statistics["numeric_columns"]:
+            data[col] = pd.to_numeric(data[col], errors="coerce")
+        else:
+            data[col] = data[col].astype(object)
+    if data.empty:
+        return data
+    
+    data = handle_missing_values(data, medians=statistics["medians"])
+    if PHASES.index(phase) >= PHASES.index("filtered_moments"):
+        data = remove_outliers(data, means=statistics["imputed_mean"], stds=statistics["imputed_std"])
+    if PHASES.index(phase) >= PHASES.index("engineer"):
+        data = standardize_data(data, means=statistics["filtered_mean"], stds=statistics["filtered_std"])
+    return data
+
+# Function to process one shard
+def process_shard(shard: dict, run: dict):
+    """
+    Runs one phase of a shard. Outputs are named after the shard and replaced atomically, so reprocessing a shard
+    (e.g. after its lease expired) overwrites rather than duplicates its results.
+    
+    Parameters:
+    shard (dict): The shard, as returned by claim_shard.
+    run (dict): The run the shard belongs to.
+    
+    Returns:
+    int: The number of rows processed.
+    """
+    if shard["phase"] == "collect":
+        return collect_shard(shard, run)
+    
+    statistics = _load_statistics(run)
+    data = clean_shard(shard, run, statistics, shard["phase"])
+    
+    if shard["phase"] == "engineer":
+        if not data.empty:
+            data = create_maintenance_critical_metrics(calculate_idle_time(create_fuel_efficiency_per_trip(data)))
+        _write_atomic(data, _shard_path(run, "engineered", shard["shard_index"], ".csv"))
+        return len(data)
+    
+    # Count, mean and sum of squared deviations of each feature column, combined by the coordinator
+    moments = {}
+    for col in statistics["feature_columns"]:
+        values = data[col].dropna().to_numpy(dtype=np.float64)
+        mean = float(values.mean()) if len(values) else 0.0
+        moments[col] = [len(values), mean, float(((values - mean) ** 2).sum())]
+    _write_atomic(moments, _shard_path(run, shard["phase"], shard["shard_index"], ".json"))
+    return len(data)
+
+# Function to record the outcome of a shard
+def finish_shard(conn: sqlite3.Connection, shard: dict, rows: int = None, error: str = None):
+    """
+    Marks a shard as done, or records its error and returns it to the queue until MAX_SHARD_ATTEMPTS is reached.
+    
+    Parameters:
+    conn (sqlite3.Connection): A connection to the work queue.
+    shard (dict): The shard that was processed.
+    rows (int): The number of rows written, on success.
+    error (str): The error raised, on failure.
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    if error is None:
+        conn.execute("UPDATE shards SET status = 'done', rows = ?, error = NULL, updated_at = ? "
+                     "WHERE shard_id = ? AND status != 'done'", (rows, now, shard["shard_id"]))
+    else:
+        status = "failed" if shard["attempts"] + 1 >= MAX_SHARD_ATTEMPTS else "pending"
+        conn.execute("UPDATE shards SET status = ?, error = ?, updated_at = ? WHERE shard_id = ? AND status != 'done'",
+                     (status, error, now, shard["shard_id"]))
+
+# Function to look up a run
+def _get_run(conn: sqlite3.Connection, run_id: str = None):
+    if run_id is None:
+        cursor = conn.execute("SELECT * FROM runs WHERE status = 'running' ORDER BY created_at DESC LIMIT 1")
+    else:
+        cursor = conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,))
+    row = cursor.fetchone()
+    return dict(zip([column[0] for column in cursor.description], row)) if row else None
+
+# Function to count the shards of a run by status
+def shard_status(conn: sqlite3.Connection, run_id: str, phase: str = None):
+    """
+    Returns the number of shards of a run in each status.
+    
+    Parameters:
+    conn (sqlite3.Connection): A connection to the work queue.
+    run_id (str): The id of the run.
+    phase (str): Only count the shards of this phase.
+    
+    Returns:
+    dict: The number of shards per status.
+    """
+    if phase is None:
+        rows = conn.execute("SELECT status, count(*) FROM shards WHERE run_id = ? GROUP BY status", (run_id,)).fetchall()
+    else:
+        rows = conn.execute("SELECT status, count(*) FROM shards WHERE run_id = ? AND phase = ? GROUP BY status",
+                            (run_id, phase)).fetchall()
+    return dict(rows)
+
+# Main function of a worker process
+def run_worker(queue_path: str = None, run_id: str = None, worker: str = None):
+    """
+    Claims and processes shards until the run is no longer running. Workers stay up between phases, while the
+    coordinator computes the statistics for the next one. Any number of workers, on this host or on other hosts
+    that share the queue directory, can serve the same run.
+    
+    Parameters:
+    queue_path (str): The path to the queue database (defaults to work_queue.db in WORK_QUEUE_DIRECTORY).
+    run_id (str): The run to work on (defaults to the most recent unfinished run).
+    worker (str): The name of this worker (defaults to host name and process id).
+    
+    Returns:
+    int: The number of shards processed by this worker.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    conn = open_queue(queue_path)
+    processed = 0
+    try:
+        run = _get_run(conn, run_id)
+        if run is None:
+            print("No run available to work on.")
+            return 0
+        
+        while run is not None and run["status"] == "running":
+            shard = claim_shard(conn, run["run_id"], worker)
+            if shard is None:
+                # Wait for the next phase, or for the lease of another worker to expire
+                time.sleep(POLL_INTERVAL)
+            else:
+                try:
+                    rows = process_shard(shard, run)
+                    finish_shard(conn, shard, rows=rows)
+                    processed += 1
+                    print(f"Worker {worker} finished shard {shard['shard_id']} ({rows} rows).")
+                except Exception:
+                    finish_shard(conn, shard, error=traceback.format_exc())
+                    print(f"Worker {worker} failed shard {shard['shard_id']}.")
+            run = _get_run(conn, run["run_id"])
+    finally:
+        conn.close()
+    return processed
+
+# Function to find the k-th smallest value across sorted arrays
+def _kth_smallest(arrays: list, k: int):
+    # Narrow a window of every array around the answer, pivoting on the middle of the widest window; only the pivots
+    # and binary searches touch the arrays, so they can stay memory-mapped
+    low = [0] * len(arrays)
+    high = [len(values) for values in arrays]
+    while True:
+        widest = max(range(len(arrays)), key=lambda i: high[i] - low[i])
+        pivot = arrays[widest][(low[widest] + high[widest]) // 2]
+        below = [int(np.searchsorted(values, pivot, side="left")) for values in arrays]
+        through = [int(np.searchsorted(values, pivot, side="right")) for values in arrays]
+        if sum(below) <= k < sum(through):
+            return float(pivot)
+        if k < sum(below):
+            high = [min(h, b) for h, b in zip(high, below)]
+        else:
+            low = [max(l, t) for l, t in zip(low, through)]
+
+# Function to combine the collect phase outputs into the columns and medians of the run
+def collect_statistics(run: dict, num_shards: int):
+    """
+    Determines the columns of the whole dataset and their types, and computes the exact median of every numeric
+    column from the sorted values written by each shard.
+    
+    Parameters:
+    run (dict): The run.
+    num_shards (int): The number of shards of the run.
+    
+    Returns:
+    dict: The columns, numeric columns, feature columns and medians.
+    """
+    columns, object_columns = [], set()
+    for i in range(num_shards):
+        with open(_shard_path(run, "collect", i, ".json"), "r") as f:
+            column_kinds = json.load(f)["columns"]
+        for col, kind in column_kinds.items():
+            if col not in columns:
+                columns.append(col)
+            if kind == "object":
+                object_columns.add(col)
+    
+    # Columns without any value are read back from CSV as numbers by the in-memory pipeline
+    numeric_columns = [col for col in columns if col not in object_columns]
+    medians = {}
+    for col in numeric_columns:
+        paths = [_shard_path(run, "collect", i, f".{col}.npy") for i in range(num_shards)]
+        arrays = [values for values in (np.load(path, mmap_mode="r") for path in paths if os.path.exists(path)) if len(values)]
+        count = sum(len(values) for values in arrays)
+        if count == 0:
+            medians[col] = float("nan")
+        elif count % 2:
+            medians[col] = _kth_smallest(arrays, count // 2)
+        else:
+            medians[col] = (_kth_smallest(arrays, count // 2 - 1) + _kth_smallest(arrays, count // 2)) / 2
+    return {
+        "columns": columns,
+        "numeric_columns": numeric_columns,
+        "feature_columns": [col for col in numeric_columns if col not in NON_FEATURE_COLUMNS],
+        "medians": medians,
+    }
+
+# Function to combine the moments reported by every shard
+def combine_moments(run: dict, phase: str, num_shards: int):
+    """
+    Combines the per-shard count, mean and sum of squared deviations of each feature column into the global
+    mean and sample standard deviation, using the pairwise update of Chan et al.
+    
+    Parameters:
+    run (dict): The run.
+    phase (str): The moments phase whose outputs to combine.
+    num_shards (int): The number of shards of the run.
+    
+    Returns:
+    tuple: The means and standard deviations, as dictionaries keyed by column.
+    """
+    totals = {}
+    for i in range(num_shards):
+        with open(_shard_path(run, phase, i, ".json"), "r") as f:
+            moments = json.load(f)
+        for col, (count_b, mean_b, m2_b) in moments.items():
+            count_a, mean_a, m2_a = totals.get(col, (0, 0.0, 0.0))
+            if count_b == 0:
+                totals[col] = (count_a, mean_a, m2_a)
+                continue
+            count = count_a + count_b
+            delta = mean_b - mean_a
+            totals[col] = (count, mean_a + delta * count_b / count, m2_a + m2_b + delta ** 2 * count_a * count_b / count)
+    
+    means, stds = {}, {}
+    for col, (count, mean, m2) in totals.items():
+        means[col] = mean if count else float("nan")
+        stds[col] = float(np.sqrt(m2 / (count - 1))) if count > 1 else float("nan")
+    return means, stds
+
+# Function to merge the shard outputs of a finished run
+def merge_results(run: dict, shards: list, processed_path: str, export_path: str):
+    """
+    Merges the engineered shard files one vehicle range at a time: the date ranges of each vehicle range are
+    concatenated, the per-vehicle idle time is recomputed over the full history, and the range is appended to the
+    processed data file and the dashboard export and upserted into the feature store.
+    
+    Parameters:
+    run (dict): The finished run.
+    shards (list): The shard boundaries of the run, as returned by plan_shards.
+    processed_path (str): Where to write the merged engineered data.
+    export_path (str): Where to write the dashboard export.
+    
+    Returns:
+    int: The number of engineered rows merged.
+    """
+    vehicle_ranges = {}
+    for i, (vmin, vmax, _, _) in enumerate(shards):
+        vehicle_ranges.setdefault((vmin, vmax), []).append(_shard_path(run, "engineered", i, ".csv"))
+    
+    # Use the union of the shard columns, in order of first appearance
+    columns = []
+    for file_paths in vehicle_ranges.values():
+        for file_path in file_paths:
+            for col in pd.read_csv(file_path, nrows=0).columns:
+                if col not in columns:
+                    columns.append(col)
+    
+    # Both outputs are written next to their destination and replaced once complete
+    processed_tmp = f"{processed_path}.{uuid.uuid4().hex}.tmp"
+    export_tmp = f"{export_path}.{uuid.uuid4().hex}.tmp"
+    total_rows = 0
+    header = True
+    for file_paths in vehicle_ranges.values():
+        frames = [frame for frame in (pd.read_csv(file_path) for file_path in file_paths) if not frame.empty]
+        if not frames:
+            continue
+        range_data = calculate_idle_time(pd.concat(frames, ignore_index=True))
+        range_data.reindex(columns=columns).to_csv(processed_tmp, mode="w" if header else "a", header=header, index=False)
+        prepare_data_for_export(range_data).to_csv(export_tmp, mode="w" if header else "a", header=header, index=False)
+        header = False
+        total_rows += len(range_data)
+        update_feature_store(range_data)
+    
+    if header:
+        print("No engineered rows to merge.")
+        return 0
+    os.replace(processed_tmp, processed_path)
+    os.replace(export_tmp, export_path)
+    print(f"Merged {total_rows} engineered rows into {processed_path}.")
+    print(f"Dashboard export written to {export_path}.")
+    return total_rows
+
+# Main function of the coordinator
+def run_coordinator(num_workers: int = DISTRIBUTED_WORKERS, num_vehicle_shards: int = DISTRIBUTED_VEHICLE_SHARDS,
+                    shard_days: int = DISTRIBUTED_SHARD_DAYS, processed_path: str = None, export_path: str = None,
+                    retrain: bool = True, run_id: str = None):
+    """
+    Stages the new CSV drops, publishes a new run, starts num_workers local worker processes (more can join from
+    other hosts with 'python distributed_pipeline.py worker'), and queues the phases of every shard one after the
+    other, computing the global statistics in between. It then merges the results and optionally retrains the model.
+    
+    Parameters:
+    num_workers (int): The number of local worker processes to start (0 to rely on remote workers only).
+    num_vehicle_shards (int): The number of vehicle_id ranges to split the fleet into.
+    shard_days (int): The length of the date ranges per shard, or None for the full history per shard.
+    processed_path (str): Where to write the merged engineered data (defaults to PROCESSED_DATA_PATH).
+    export_path (str): Where to write the dashboard export (defaults to EXPORT_FILE_PATH).
+    retrain (bool): Whether to retrain and save the model after merging.
+    run_id (str): The id of the run (defaults to a timestamp with a random suffix); it must not exist in the queue yet.
+    
+    Returns:
+    bool: True if every shard succeeded and the results were merged.
+    """
+    processed_path = processed_path or PROCESSED_DATA_PATH
+    export_path = export_path or EXPORT_FILE_PATH
+    run_id = run_id or f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    output_dir = os.path.abspath(os.path.join(WORK_QUEUE_DIRECTORY, "runs", run_id))
+    staging_path = os.path.join(output_dir, "staging.db")
+    queue_path = os.path.join(WORK_QUEUE_DIRECTORY, "work_queue.db")
+    os.makedirs(WORK_QUEUE_DIRECTORY, exist_ok=True)
+    conn = open_queue(queue_path)
+    try:
+        publish_run(conn, run_id, staging_path, output_dir)
+    except sqlite3.IntegrityError:
+        print(f"Run {run_id} already exists in the work queue; choose a new run id.")
+        conn.close()
+        return False
+    for directory in ("collect", "imputed_moments", "filtered_moments", "engineered"):
+        os.makedirs(os.path.join(output_dir, directory), exist_ok=True)
+    workers = []
+    succeeded = False
+    
+    try:
+        staged_data, ingested_files = stage_csv_drops(staging_path)
+        sources = [(data_collection.SQL_DATABASE_PATH, SQL_START_DATE), (data_collection.RAW_STORE_PATH, None),
+                   (staging_path, None)]
+        shards = plan_shards(sources, num_vehicle_shards, shard_days)
+        if not shards:
+            print("No data available for the distributed pipeline.")
+            return False
+        
+        # Start the local workers; they serve every phase and exit once the run is no longer running
+        context = multiprocessing.get_context("spawn")
+        workers = [context.Process(target=run_worker, args=(queue_path, run_id, f"{socket.gethostname()}-local{i}"))
+                   for i in range(num_workers)]
+        for process in workers:
+            process.start()
+        
+        statistics = {}
+        for phase in PHASES:
+            publish_phase(conn, run_id, phase, shards)
+            while True:
+                status = shard_status(conn, run_id, phase)
+                if not status.get("pending") and not status.get("running"):
+                    break
+                if workers and not any(process.is_alive() for process in workers) and status.get("pending"):
+                    print("All local workers exited with shards still pending.")
+                    break
+                time.sleep(POLL_INTERVAL)
+            print(f"Phase {phase} of run {run_id} finished with shard status {status}.")
+            if set(status) != {"done"}:
+                return False
+            
+            # Combine the shard outputs into the statistics applied by the next phase
+            run = _get_run(conn, run_id)
+            if phase == "collect":
+                statistics.update(collect_statistics(run, len(shards)))
+            elif phase != "engineer":
+                prefix = phase.replace("_moments", "")
+                statistics[f"{prefix}_mean"], statistics[f"{prefix}_std"] = combine_moments(run, phase, len(shards))
+            _write_atomic(statistics, os.path.join(output_dir, "statistics.json"))
+        
+        conn.execute("UPDATE runs SET status = 'merging' WHERE run_id = ?", (run_id,))
+        merge_results(run, shards, processed_path, export_path)
+        commit_ingested_batch(staged_data, ingested_files)
+        conn.execute("UPDATE runs SET status = 'done' WHERE run_id = ?", (run_id,))
+        succeeded = True
+        
+        # The collected records are a full copy of the input and are no longer needed
+        shutil.rmtree(os.path.join(output_dir, "collect"), ignore_errors=True)
+    finally:
+        if not succeeded:
+            conn.execute("UPDATE runs SET status = 'failed' WHERE run_id = ? AND status IN ('running', 'merging')", (run_id,))
+        for process in workers:
+            if process.pid is not None:
+                process.join()
+        conn.close()
+    
+    if retrain:
+        from automation_pipeline import train_and_save_model
+        train_and_save_model()
+    return True
+
+# Example usage of the function
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the pipeline as shards over several worker processes.")
+    subparsers = parser.add_subparsers(dest="role", required=True)
+    coordinator = subparsers.add_parser("coordinator", help="Publish a run, start local workers and merge the results")
+    coordinator.add_argument("--workers", type=int, default=DISTRIBUTED_WORKERS)
+    coordinator.add_argument("--vehicle-shards", type=int, default=DISTRIBUTED_VEHICLE_SHARDS)
+    coordinator.add_argument("--shard-days", type=int, default=DISTRIBUTED_SHARD_DAYS)
+    coordinator.add_argument("--no-retrain", action="store_true")
+    worker = subparsers.add_parser("worker", help="Process shards of a published run")
+    worker.add_argument("--queue", default=os.path.join(WORK_QUEUE_DIRECTORY, "work_queue.db"))
+    worker.add_argument("--run-id")
+    args = parser.parse_args()
+    
+    if args.role == "coordinator":
+        run_coordinator(args.workers, args.vehicle_shards, args.shard_days, retrain=not args.no_retrain)
+    else:
+        run_worker(args.queue, args.run_id)
@@ -0,0 +1,188 @@
+# feature_store.py
+# This script maintains an online feature store holding the latest engineered features of every vehicle.
+# After each feature engineering run the newest record and rolling aggregates of each vehicle are upserted into a
+# SQLite table keyed by vehicle_id, so scoring and dashboard drill-downs can look vehicles up without reloading the data.
+
+import sqlite3
+import threading
+from datetime import datetime
+import pandas as pd
+from config import FEATURE_ROLLING_WINDOW, SQLITE_JOURNAL_MODE, SQLITE_MMAP_SIZE
+
+# Define the path to the feature store database
+FEATURE_STORE_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/feature_store.db"
+
+# Latest engineered values stored per vehicle
+FEATURE_COLUMNS = [
+    "date", "distance_traveled", "fuel_consumed", "average_speed", "engine_load", "fuel_efficiency",
+    "maintenance_required", "fuel_efficiency_per_trip", "idle_time", "high_engine_load", "high_speed_driving",
+]
+# Columns averaged over each vehicle's last FEATURE_ROLLING_WINDOW records
+ROLLING_MEAN_COLUMNS = ["fuel_efficiency", "average_speed", "engine_load", "fuel_efficiency_per_trip"]
+AGGREGATE_COLUMNS = ["rolling_" + col for col in ROLLING_MEAN_COLUMNS] + ["rolling_maintenance_count", "record_count"]
+STORE_COLUMNS = ["vehicle_id", "last_timestamp"] + FEATURE_COLUMNS + AGGREGATE_COLUMNS + ["updated_at"]
+
+# Number of vehicle ids bound per bulk lookup statement
+LOOKUP_BATCH_SIZE = 900
+
+# One cached connection per feature store file
+_connections = {}
+_connection_lock = threading.Lock()
+
+# Function to convert numpy scalars (e.g. ids taken from a DataFrame) to values SQLite can bind
+def _native(value):
+    return value.item() if hasattr(value, "item") else value
+
+# Function to get the (cached) connection to the feature store
+def get_connection(store_path: str = None):
+    """
+    Returns a connection to the feature store, creating the table on first use. The connection is cached so
+    repeated lookups do not pay for opening the database.
+    
+    Parameters:
+    store_path (str): The path to the feature store database (defaults to FEATURE_STORE_PATH).
+    
+    Returns:
+    sqlite3.Connection: The connection to the feature store.
+    """
+    store_path = store_path or FEATURE_STORE_PATH
+    with _connection_lock:
+        conn = _connections.get(store_path)
+        if conn is None:
+            conn = sqlite3.connect(store_path, check_same_thread=False)
+            conn.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(f"PRAGMA mmap_size = {int(SQLITE_MMAP_SIZE)}")
+            columns = ", ".join(f'"{col}"' for col in STORE_COLUMNS[1:])
+            conn.execute(f'CREATE TABLE IF NOT EXISTS vehicle_features (vehicle_id PRIMARY KEY, {columns}) WITHOUT ROWID')
+            conn.commit()
+            _connections[store_path] = conn
+        return conn
+
+# Function to close the cached feature store connections
+def close_connections():
+    """
+    Closes every cached feature store connection.
+    """
+    with _connection_lock:
+        for conn in _connections.values():
+            conn.close()
+        _connections.clear()
+
+# Function to build the per-vehicle snapshot of an engineered dataset
+def build_feature_snapshot(data: pd.DataFrame):
+    """
+    Reduces engineered data to one row per vehicle: the features of its most recent record, the means of the
+    rolling columns over its last FEATURE_ROLLING_WINDOW records, and its record count.
+    
+    Parameters:
+    data (pd.DataFrame): The engineered data, as produced by engineer_features.
+    
+    Returns:
+    pd.DataFrame: The snapshot, with the columns of the feature store.
+    """
+    order_column = "timestamp" if "timestamp" in data.columns else ("date" if "date" in data.columns else None)
+    ordered = data.sort_values(order_column, kind="stable") if order_column else data
+    grouped = ordered.groupby("vehicle_id", sort=False)
+    
+    snapshot = grouped.tail(1).set_index("vehicle_id")
+    snapshot = snapshot.reindex(columns=FEATURE_COLUMNS).assign(
+        last_timestamp=snapshot[order_column] if order_column else None
+    )
+    
+    window = grouped.tail(FEATURE_ROLLING_WINDOW).groupby("vehicle_id", sort=False)
+    for col in ROLLING_MEAN_COLUMNS:
+        snapshot["rolling_" + col] = window[col].mean() if col in data.columns else None
+    snapshot["rolling_maintenance_count"] = (window["maintenance_required"].sum()
+                                             if "maintenance_required" in data.columns else None)
+    snapshot["record_count"] = grouped.size()
+    snapshot["updated_at"] = datetime.now().isoformat(timespec="seconds")
+    return snapshot.reset_index()[STORE_COLUMNS]
+
+# Function to upsert a snapshot into the feature store
+def upsert_features(snapshot: pd.DataFrame, store_path: str = None):
+    """
+    Inserts or updates one row per vehicle. A stored vehicle is only overwritten by a snapshot whose latest
+    record is at least as recent, so replaying an older batch cannot roll a vehicle back.
+    
+    Parameters:
+    snapshot (pd.DataFrame): The per-vehicle snapshot, as produced by build_feature_snapshot.
+    store_path (str): The path to the feature store database (defaults to FEATURE_STORE_PATH).
+    
+    Returns:
+    int: The number of vehicles in the snapshot.
+    """
+    if snapshot.empty:
+        return 0
+    conn = get_connection(store_path)
+    columns = ", ".join(f'"{col}"' for col in STORE_COLUMNS)
+    placeholders = ", ".join("?" for _ in STORE_COLUMNS)
+    updates = ", ".join(f'"{col}" = excluded."{col}"' for col in STORE_COLUMNS[1:])
+    
+    # Convert to plain Python values (numpy scalars cannot be bound) with missing values as NULL
+    values = snapshot[STORE_COLUMNS].astype(object)
+    values = values.where(values.notna(), None)
+    with conn:
+        conn.executemany(
+            f"INSERT INTO vehicle_features ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT (vehicle_id) DO UPDATE SET {updates} "
+            f"WHERE excluded.last_timestamp IS NULL OR vehicle_features.last_timestamp IS NULL "
+            f"OR excluded.last_timestamp >= vehicle_features.last_timestamp",
+            values.itertuples(index=False, name=None),
+        )
+    return len(snapshot)
+
+# Main function to update the feature store after a feature engineering run
+def update_feature_store(data: pd.DataFrame, store_path: str = None):
+    """
+    Updates the feature store with the latest features and rolling aggregates of every vehicle in the data.
+    
+    Parameters:
+    data (pd.DataFrame): The engineered data.
+    store_path (str): The path to the feature store database (defaults to FEATURE_STORE_PATH).
+    """
+    if data.empty or "vehicle_id" not in data.columns:
+        print("No engineered data available for the feature store.")
+        return
+    try:
+        updated = upsert_features(build_feature_snapshot(data), store_path)
+        print(f"Feature store updated for {updated} vehicles.")
+    except Exception as e:
+        print(f"Error updating feature store: {e}")
+
+# Function to look up the features of one vehicle
+def get_vehicle_features(vehicle_id, store_path: str = None):
+    """
+    Looks up the stored features of a single vehicle by primary key.
+    
+    Parameters:
+    vehicle_id: The id of the vehicle.
+    store_path (str): The path to the feature store database (defaults to FEATURE_STORE_PATH).
+    
+    Returns:
+    dict: The stored features of the vehicle, or None if the vehicle is not in the store.
+    """
+    conn = get_connection(store_path)
+    row = conn.execute("SELECT * FROM vehicle_features WHERE vehicle_id = ?", (_native(vehicle_id),)).fetchone()
+    return dict(zip(STORE_COLUMNS, row)) if row is not None else None
+
+# Function to look up the features of many vehicles
+def get_features_bulk(vehicle_ids: list, store_path: str = None):
+    """
+    Looks up the stored features of many vehicles at once. Vehicles missing from the store are omitted.
+    
+    Parameters:
+    vehicle_ids (list): The ids of the vehicles.
+    store_path (str): The path to the feature store database (defaults to FEATURE_STORE_PATH).
+    
+    Returns:
+    pd.DataFrame: One row per vehicle found, with the columns of the feature store.
+    """
+    conn = get_connection(store_path)
+    vehicle_ids = list(dict.fromkeys(_native(vehicle_id) for vehicle_id in vehicle_ids))
+    rows = []
+    for start in range(0, len(vehicle_ids), LOOKUP_BATCH_SIZE):
+        batch = vehicle_ids[start:start + LOOKUP_BATCH_SIZE]
+        placeholders = ", ".join("?" for _ in batch)
+        rows.extend(conn.execute(f"SELECT * FROM vehicle_features WHERE vehicle_id IN ({placeholders})", batch))
+    return pd.DataFrame(rows, columns=STORE_COLUMNS)
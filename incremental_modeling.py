@@ -0,0 +1,336 @@
+# incremental_modeling.py
+# This script trains the maintenance prediction model out-of-core, for histories too large to fit the forest in memory.
+# The engineered data is streamed in chunks: a scaler and a logistic-regression SGD classifier are updated with
+# partial_fit, rare maintenance records are up-weighted, progress is checkpointed after every chunk so an interrupted
+# run resumes where it stopped, and the result is compared with the batch Random Forest on the same holdout records.
+
+import json
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from deduplication import hash_record_keys
+from predictive_modeling import train_model
+from config import (DEDUP_KEY_COLUMNS, INCREMENTAL_CHUNK_SIZE, INCREMENTAL_EPOCHS, INCREMENTAL_HOLDOUT_FRACTION,
+                    INCREMENTAL_ALPHA, COMPARISON_SAMPLE_SIZE)
+
+# Define paths for the engineered data, the training checkpoint and the comparison report
+DATA_FILE_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/engineered_data.csv"
+CHECKPOINT_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/incremental_checkpoint.pkl"
+REPORT_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/model_comparison.json"
+
+TARGET_COLUMN = "maintenance_required"
+CLASSES = np.array([0, 1])
+
+# Function to stream the engineered data in chunks
+def iter_chunks(file_paths: list, chunk_size: int = INCREMENTAL_CHUNK_SIZE):
+    """
+    Reads the engineered data files one chunk at a time, so that memory use is bounded by the chunk size.
+    
+    Parameters:
+    file_paths (list): The engineered data files (e.g. the processed data file or the shard outputs of a distributed run).
+    chunk_size (int): The number of rows per chunk.
+    
+    Yields:
+    pd.DataFrame: The next chunk, with infinite values (e.g. from divisions by zero) replaced by missing values.
+    """
+    for file_path in file_paths:
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+            chunk = chunk[chunk[TARGET_COLUMN].notna()] if TARGET_COLUMN in chunk.columns else chunk.iloc[0:0]
+            if not chunk.empty:
+                yield chunk.replace([np.inf, -np.inf], np.nan)
+
+# Function to hash the records of a chunk by key (by row number if the key columns are missing)
+def _record_hashes(chunk: pd.DataFrame):
+    if all(col in chunk.columns for col in DEDUP_KEY_COLUMNS):
+        return hash_record_keys(chunk).view(np.uint64)
+    return pd.util.hash_pandas_object(chunk.index.to_series(), index=False).to_numpy()
+
+# Function to assign records to the holdout set
+def holdout_mask(chunk: pd.DataFrame, fraction: float = INCREMENTAL_HOLDOUT_FRACTION):
+    """
+    Selects the holdout records of a chunk by hashing their keys, so every pass (and every resumed run)
+    assigns a record to the same side without keeping a list of holdout rows.
+    
+    Parameters:
+    chunk (pd.DataFrame): The chunk to split.
+    fraction (float): The fraction of records held out for evaluation.
+    
+    Returns:
+    np.ndarray: True for the holdout records.
+    """
+    return _record_hashes(chunk) % np.uint64(10000) < np.uint64(int(fraction * 10000))
+
+# Function to extract the features and target of a chunk
+def chunk_features(chunk: pd.DataFrame, feature_columns: list):
+    """
+    Extracts the feature columns (missing ones as missing values) and the target of a chunk.
+    
+    Parameters:
+    chunk (pd.DataFrame): The chunk.
+    feature_columns (list): The feature columns, fixed on the first chunk.
+    
+    Returns:
+    X (pd.DataFrame): The features.
+    y (np.ndarray): The target.
+    """
+    X = chunk.reindex(columns=feature_columns).apply(pd.to_numeric, errors="coerce")
+    return X, chunk[TARGET_COLUMN].to_numpy().astype(int)
+
+# Function to scale features with the incrementally fitted scaler
+def scale_features(scaler: StandardScaler, X: pd.DataFrame):
+    """
+    Standardizes the features; values still missing are imputed with the mean (0 after scaling).
+    """
+    return np.nan_to_num(scaler.transform(X), nan=0.0)
+
+# Function to compute balanced sample weights for the rare maintenance label
+def balanced_sample_weights(y: np.ndarray, class_counts: np.ndarray):
+    """
+    Weights each record inversely to the frequency of its class in the training data, as class_weight="balanced"
+    would for an in-memory fit.
+    
+    Parameters:
+    y (np.ndarray): The target of the records.
+    class_counts (np.ndarray): The number of training records of each class.
+    
+    Returns:
+    np.ndarray: The weight of each record.
+    """
+    weights = class_counts.sum() / (len(CLASSES) * np.maximum(class_counts, 1))
+    return weights[y]
+
+# Function to identify the training data, so a checkpoint is only resumed on the same files
+def _source_signature(file_paths: list, chunk_size: int):
+    signature = []
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        signature.append([os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns])
+    return {"files": signature, "chunk_size": chunk_size}
+
+# Function to save a checkpoint atomically
+def save_checkpoint(state: dict, checkpoint_path: str):
+    """
+    Saves the training state, writing to a temporary file first so an interruption never leaves a corrupt checkpoint.
+    
+    Parameters:
+    state (dict): The training state.
+    checkpoint_path (str): The path of the checkpoint.
+    """
+    tmp_path = checkpoint_path + ".tmp"
+    joblib.dump(state, tmp_path)
+    os.replace(tmp_path, checkpoint_path)
+
+# Function to load a checkpoint matching the training data
+def load_checkpoint(checkpoint_path: str, signature: dict):
+    """
+    Loads the training state saved by an earlier run on the same data.
+    
+    Parameters:
+    checkpoint_path (str): The path of the checkpoint.
+    signature (dict): The signature of the training data.
+    
+    Returns:
+    dict: The training state, or None if there is no usable checkpoint.
+    """
+    try:
+        state = joblib.load(checkpoint_path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable checkpoint {checkpoint_path}: {e}")
+        return None
+    if state.get("signature") != signature:
+        print("Checkpoint belongs to different training data; starting over.")
+        return None
+    return state
+
+# Function to train the model incrementally
+def train_incremental_model(file_paths: list = None, chunk_size: int = INCREMENTAL_CHUNK_SIZE,
+                            epochs: int = INCREMENTAL_EPOCHS, checkpoint_path: str = None, resume: bool = True):
+    """
+    Trains a scaler and an SGD logistic regression on the training records, streaming the data in chunks.
+    The first pass fits the scaler and counts the classes; each following pass (epoch) updates the classifier
+    with balanced sample weights. A checkpoint is saved after every chunk.
+    
+    Parameters:
+    file_paths (list): The engineered data files (defaults to DATA_FILE_PATH).
+    chunk_size (int): The number of rows per chunk.
+    epochs (int): The number of passes of the classifier over the training records.
+    checkpoint_path (str): The path of the checkpoint (defaults to CHECKPOINT_PATH).
+    resume (bool): Whether to resume from a checkpoint saved by an earlier run on the same data.
+    
+    Returns:
+    dict: The training state, with the fitted scaler and model, the feature columns and the class counts.
+    """
+    file_paths = file_paths or [DATA_FILE_PATH]
+    checkpoint_path = checkpoint_path or CHECKPOINT_PATH
+    signature = _source_signature(file_paths, chunk_size)
+    
+    state = load_checkpoint(checkpoint_path, signature) if resume else None
+    if state is not None:
+        print(f"Resuming incremental training at epoch {state['epoch']}, chunk {state['chunk']}.")
+    else:
+        state = {
+            "signature": signature, "epoch": 0, "chunk": 0, "feature_columns": None,
+            "scaler": StandardScaler(), "class_counts": np.zeros(len(CLASSES), dtype=np.int64),
+            "model": SGDClassifier(loss="log_loss", alpha=INCREMENTAL_ALPHA, random_state=42),
+            "train_seconds": 0.0,
+        }
+    
+    # Epoch 0 fits the scaler and counts the classes; epochs 1..epochs train the classifier
+    while state["epoch"] <= epochs:
+        for i, chunk in enumerate(iter_chunks(file_paths, chunk_size)):
+            if i < state["chunk"]:
+                continue
+            start = time.perf_counter()
+            if state["feature_columns"] is None:
+                state["feature_columns"] = [col for col in chunk.select_dtypes(include=[np.number]).columns
+                                            if col not in (TARGET_COLUMN, "vehicle_id")]
+            train = chunk[~holdout_mask(chunk)]
+            if not train.empty:
+                X, y = chunk_features(train, state["feature_columns"])
+                if state["epoch"] == 0:
+                    state["scaler"].partial_fit(X)
+                    state["class_counts"] += np.bincount(y, minlength=len(CLASSES))[:len(CLASSES)]
+                else:
+                    state["model"].partial_fit(scale_features(state["scaler"], X), y, classes=CLASSES,
+                                               sample_weight=balanced_sample_weights(y, state["class_counts"]))
+            state["chunk"] = i + 1
+            state["train_seconds"] += time.perf_counter() - start
+            save_checkpoint(state, checkpoint_path)
+        
+        if state["epoch"] == 0:
+            print(f"Scaler fitted on {int(state['class_counts'].sum())} training records ({state['chunk']} chunks).")
+        else:
+            print(f"Incremental training epoch {state['epoch']} of {epochs} completed.")
+        state["epoch"] += 1
+        state["chunk"] = 0
+        save_checkpoint(state, checkpoint_path)
+    
+    if state["feature_columns"] is None or state["class_counts"].sum() == 0:
+        print("No data available for incremental training.")
+    return state
+
+# Function to compute metrics from a confusion matrix
+def confusion_metrics(matrix: np.ndarray):
+    """
+    Computes the accuracy, and the precision, recall and F1 score of the maintenance class, from a 2x2
+    confusion matrix (rows are true labels, columns predictions).
+    
+    Parameters:
+    matrix (np.ndarray): The confusion matrix.
+    
+    Returns:
+    dict: The metrics.
+    """
+    tn, fp, fn, tp = (int(value) for value in matrix.ravel())
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        "accuracy": (tp + tn) / max(matrix.sum(), 1),
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "confusion_matrix": matrix.tolist(),
+    }
+
+# Function to compare the incremental model with the batch Random Forest
+def compare_with_batch_model(state: dict, file_paths: list = None, chunk_size: int = INCREMENTAL_CHUNK_SIZE,
+                             sample_size: int = COMPARISON_SAMPLE_SIZE, report_path: str = None):
+    """
+    Trains the batch Random Forest on a hashed sample of at most sample_size training records (the forest
+    needs its training data in memory), then streams the holdout records once to accumulate the confusion
+    matrix of both models. The report is printed and saved as JSON.
+    
+    Parameters:
+    state (dict): The training state returned by train_incremental_model.
+    file_paths (list): The engineered data files (defaults to DATA_FILE_PATH).
+    chunk_size (int): The number of rows per chunk.
+    sample_size (int): The maximum number of training records for the forest.
+    report_path (str): The path of the report (defaults to REPORT_PATH).
+    
+    Returns:
+    dict: The metrics and training time of each model.
+    """
+    file_paths = file_paths or [DATA_FILE_PATH]
+    report_path = report_path or REPORT_PATH
+    scaler, feature_columns = state["scaler"], state["feature_columns"]
+    
+    # Sample the forest's training records by key hash, independently of the holdout split
+    sample_rate = min(1.0, sample_size / max(int(state["class_counts"].sum()), 1))
+    samples = []
+    for chunk in iter_chunks(file_paths, chunk_size):
+        train = chunk[~holdout_mask(chunk)]
+        if sample_rate < 1:
+            # Use other hash digits than the holdout split so the sample is uniform over the training records
+            train = train[_record_hashes(train) // np.uint64(10000) % np.uint64(10000) < np.uint64(int(sample_rate * 10000))]
+        samples.append(chunk_features(train, feature_columns))
+    X_sample = pd.concat([X for X, _ in samples])
+    y_sample = np.concatenate([y for _, y in samples])
+    start = time.perf_counter()
+    forest = train_model(scale_features(scaler, X_sample), y_sample)
+    forest_seconds = time.perf_counter() - start
+    del samples, X_sample
+    
+    # Evaluate both models on the holdout records
+    matrices = {"incremental_sgd": np.zeros((2, 2), dtype=np.int64), "batch_random_forest": np.zeros((2, 2), dtype=np.int64)}
+    for chunk in iter_chunks(file_paths, chunk_size):
+        holdout = chunk[holdout_mask(chunk)]
+        if holdout.empty:
+            continue
+        X, y = chunk_features(holdout, feature_columns)
+        X_scaled = scale_features(scaler, X)
+        for name, model in (("incremental_sgd", state["model"]), ("batch_random_forest", forest)):
+            np.add.at(matrices[name], (y, model.predict(X_scaled).astype(int)), 1)
+    
+    report = {
+        "incremental_sgd": dict(confusion_metrics(matrices["incremental_sgd"]),
+                                training_rows=int(state["class_counts"].sum()), train_seconds=round(state["train_seconds"], 3)),
+        "batch_random_forest": dict(confusion_metrics(matrices["batch_random_forest"]),
+                                    training_rows=len(y_sample), train_seconds=round(forest_seconds, 3)),
+        "holdout_rows": int(matrices["incremental_sgd"].sum()),
+    }
+    print("Model Comparison (maintenance class on holdout records):")
+    print(pd.DataFrame({name: {key: value for key, value in metrics.items() if key != "confusion_matrix"}
+                        for name, metrics in report.items() if isinstance(metrics, dict)}).T.to_string())
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Comparison report saved to {report_path}")
+    return report
+
+# Main function to train and evaluate the model out-of-core
+def incremental_modeling(file_paths: list = None, compare: bool = True):
+    """
+    Trains the incremental model on the full engineered history with bounded memory, optionally compares it
+    with the batch Random Forest, and returns it as a scaler + classifier pipeline.
+    
+    Parameters:
+    file_paths (list): The engineered data files (defaults to DATA_FILE_PATH).
+    compare (bool): Whether to write the comparison report against the batch Random Forest.
+    
+    Returns:
+    model (Pipeline): The fitted scaler and SGD classifier, or None if there was no data.
+    """
+    try:
+        state = train_incremental_model(file_paths)
+    except Exception as e:
+        print(f"Error during incremental training: {e}")
+        return None
+    if state["feature_columns"] is None or not hasattr(state["model"], "coef_"):
+        return None
+    
+    if compare:
+        try:
+            compare_with_batch_model(state, file_paths)
+        except Exception as e:
+            print(f"Error comparing with the batch model: {e}")
+    return Pipeline([("scaler", state["scaler"]), ("model", state["model"])])
+
+# Example usage of the function
+if __name__ == "__main__":
+    model = incremental_modeling()
@@ -3,9 +3,11 @@
 # The model is trained using historical performance data, operating conditions, and maintenance history.
 
 import pandas as pd
+import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
 # Define the path to the feature-engineered data file (assuming it has been saved as 'engineered_data.csv')
@@ -42,8 +44,8 @@ def split_data(data: pd.DataFrame):
     X (pd.DataFrame): Features for training the model.
     y (pd.Series): Target variable for the model.
     """
-    # Assume 'maintenance_required' is the target variable to predict
-    X = data.drop(columns=['maintenance_required', 'vehicle_id'])
+    # Assume 'maintenance_required' is the target variable to predict; text columns such as dates are not features
+    X = data.drop(columns=['maintenance_required', 'vehicle_id']).select_dtypes(include=[np.number])
     y = data['maintenance_required']
     print("Data split into features and target.")
     return X, y
@@ -87,7 +89,7 @@ def evaluate_model(model, X_test: pd.DataFrame, y_test: pd.Series):
     Evaluates the trained model using the test data and prints classification metrics.
     
     Parameters:
-    model (RandomForestClassifier): The trained model.
+    model (Pipeline): The trained model.
     X_test (pd.DataFrame): The test features.
     y_test (pd.Series): The true labels for the test set.
     """
@@ -106,12 +108,15 @@ def predictive_modeling():
     """
     Loads the engineered data, splits it into features and target, preprocesses the data,
     trains a Random Forest model, and evaluates its performance.
+    The scaler and the forest are returned as one pipeline that takes the raw features, like the model
+    trained in incremental mode, so the saved model is used the same way in both modes.
     
     Returns:
-    model (RandomForestClassifier): The trained machine learning model.
+    model (Pipeline): The fitted scaler and Random Forest, or None if there was no data to train on.
     """
     # Load the engineered data
     data = load_engineered_data(DATA_FILE_PATH)
+    model = None
     
     if not data.empty:
         # Split the data into features and target
@@ -120,15 +125,15 @@ def predictive_modeling():
         # Split the data into training and testing sets (80% train, 20% test)
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         
-        # Preprocess the data (standardization)
-        X_train_scaled = preprocess_data(X_train)
-        X_test_scaled = preprocess_data(X_test)
+        # Preprocess the data (standardization fitted on the training set only)
+        scaler = StandardScaler().fit(X_train)
+        print("Features scaled successfully.")
         
-        # Train the model
-        model = train_model(X_train_scaled, y_train)
+        # Train the model and bundle it with its scaler
+        model = Pipeline([("scaler", scaler), ("model", train_model(scaler.transform(X_train), y_train))])
         
-        # Evaluate the model
-        evaluate_model(model, X_test_scaled, y_test)
+        # Evaluate the model on the raw test features
+        evaluate_model(model, X_test, y_test)
     else:
         print("No data available for modeling.")
     
@@ -0,0 +1,383 @@
+# query_engine.py
+# This script provides an alternative, out-of-core execution backend for the cleaning, feature engineering and dashboard export stages.
+# The stages are compiled into DuckDB queries that read directly from the SQLite database and the raw store of ingested CSV records, run multi-threaded,
+# and spill to disk when the data does not fit in memory. Select it by setting EXECUTION_BACKEND = "duckdb" in config.py.
+
+import os
+from datetime import datetime
+import pandas as pd
+import data_collection
+import feature_store
+from data_cleaning import NON_FEATURE_COLUMNS
+from config import (DUCKDB_MEMORY_LIMIT, DUCKDB_THREADS, DUCKDB_TEMP_DIRECTORY, SQL_TABLE_NAME, SQL_START_DATE,
+                    PIPELINE_COLUMNS)
+
+try:
+    import duckdb
+except ImportError:  # DuckDB is optional; it is only needed when EXECUTION_BACKEND is "duckdb"
+    duckdb = None
+
+# Define the paths of the outputs written by the query pipeline
+PROCESSED_DATA_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/processed_data.csv"
+EXPORT_FILE_PATH = "C:/Users/Satej/Documents/Vehicle_Telematics/dashboard_export.csv"
+
+# DuckDB column types treated as numeric, matching pandas' select_dtypes(include=[np.number])
+NUMERIC_TYPES = ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT", "UTINYINT", "USMALLINT", "UINTEGER",
+                 "UBIGINT", "UHUGEINT", "FLOAT", "DOUBLE", "DECIMAL")
+
+# Number of rows streamed per chunk when the DuckDB sqlite extension is not available
+SQL_FETCH_CHUNK_SIZE = 100000
+
+# Function to quote an identifier for use in SQL
+def _quote(name: str):
+    return '"' + name.replace('"', '""') + '"'
+
+# Function to quote a string literal for use in SQL
+def _literal(value: str):
+    return "'" + str(value).replace("'", "''") + "'"
+
+# Function to open a DuckDB connection configured for out-of-core processing
+def connect(database_path: str = None):
+    """
+    Opens a DuckDB connection with the configured memory limit, thread count and spill directory.
+    Intermediate tables live in an on-disk database so they can exceed the available memory.
+    
+    Parameters:
+    database_path (str): The DuckDB database file for intermediate tables (defaults to a file in DUCKDB_TEMP_DIRECTORY).
+    
+    Returns:
+    duckdb.DuckDBPyConnection: The configured connection.
+    """
+    if duckdb is None:
+        raise ImportError("The duckdb package is required for the duckdb execution backend.")
+    
+    os.makedirs(DUCKDB_TEMP_DIRECTORY, exist_ok=True)
+    database_path = database_path or os.path.join(DUCKDB_TEMP_DIRECTORY, "pipeline.duckdb")
+    con = duckdb.connect(database_path)
+    con.execute(f"SET memory_limit = {_literal(DUCKDB_MEMORY_LIMIT)}")
+    con.execute(f"SET threads = {int(DUCKDB_THREADS)}")
+    con.execute(f"SET temp_directory = {_literal(DUCKDB_TEMP_DIRECTORY)}")
+    con.execute("SET preserve_insertion_order = false")
+    return con
+
+# Function to stream a SQLite table into DuckDB without the sqlite extension
+def _load_sql_in_chunks(con, db_path: str, target: str, columns: list, start_date: str = None):
+    query, params = data_collection.build_sql_query(columns=columns, start_date=start_date)
+    with data_collection.pooled_connection(db_path) as conn:
+        declared = {row[1]: (row[2] or "").upper() for row in conn.execute(f'PRAGMA table_info("{SQL_TABLE_NAME}")')}
+        
+        # Map the declared SQLite types to DuckDB types using SQLite's affinity rules
+        column_types = []
+        for col in columns:
+            declared_type = declared.get(col, "")
+            if col in data_collection.CSV_STRING_COLUMNS:
+                column_type = "VARCHAR"
+            elif "INT" in declared_type:
+                column_type = "BIGINT"
+            elif any(name in declared_type for name in ("CHAR", "CLOB", "TEXT")) or not declared_type:
+                column_type = "VARCHAR"
+            else:
+                column_type = "DOUBLE"
+            column_types.append(f"{_quote(col)} {column_type}")
+        con.execute(f"CREATE OR REPLACE TABLE {target} ({', '.join(column_types)})")
+        
+        for chunk in pd.read_sql(query, conn, params=params, chunksize=SQL_FETCH_CHUNK_SIZE):
+            con.register("sql_chunk", chunk)
+            con.execute(f"INSERT INTO {target} BY NAME SELECT * FROM sql_chunk")
+            con.unregister("sql_chunk")
+
+# Function to load a SQLite table into DuckDB
+def _load_sqlite_table(con, db_path: str, target: str, start_date: str = None):
+    if not os.path.exists(db_path):
+        return False
+    
+    available_columns = set(data_collection.get_table_columns(SQL_TABLE_NAME, db_path))
+    columns = [col for col in PIPELINE_COLUMNS if col in available_columns]
+    if not columns:
+        return False
+    
+    try:
+        con.execute("LOAD sqlite")
+    except Exception:
+        try:
+            con.execute("INSTALL sqlite")
+            con.execute("LOAD sqlite")
+        except Exception as e:
+            print(f"DuckDB sqlite extension unavailable ({e}); streaming SQL rows in chunks instead.")
+            _load_sql_in_chunks(con, db_path, target, columns, start_date)
+            return True
+    
+    projection = ", ".join(
+        f"CAST({_quote(col)} AS VARCHAR) AS {_quote(col)}" if col in data_collection.CSV_STRING_COLUMNS else _quote(col)
+        for col in columns
+    )
+    con.execute(
+        f"CREATE OR REPLACE TABLE {target} AS SELECT {projection} "
+        f"FROM sqlite_scan({_literal(db_path)}, {_literal(SQL_TABLE_NAME)})" + (" WHERE date >= ?" if start_date else ""),
+        [start_date] if start_date else [],
+    )
+    return True
+
+# Function to load every source into a single DuckDB table
+def load_sources(con):
+    """
+    Loads the SQL table and the raw store of ingested CSV records into the raw_data table, keeping only the
+    pipeline columns. CSV records duplicating SQL rows or earlier batches were dropped when they were ingested.
+    These are the same inputs collect_data reads, so both backends process the same records.
+    
+    Parameters:
+    con (duckdb.DuckDBPyConnection): The DuckDB connection.
+    
+    Returns:
+    int: The number of rows in raw_data.
+    """
+    branches = []
+    if _load_sqlite_table(con, data_collection.SQL_DATABASE_PATH, "sql_data", SQL_START_DATE):
+        branches.append("SELECT *, 0 AS _source FROM sql_data")
+    if _load_sqlite_table(con, data_collection.RAW_STORE_PATH, "csv_data"):
+        branches.append("SELECT *, 1 AS _source FROM csv_data")
+    
+    if not branches:
+        con.execute("CREATE OR REPLACE TABLE raw_data (_source INTEGER)")
+        return 0
+    
+    source = " UNION ALL BY NAME ".join(branches)
+    con.execute(f"CREATE OR REPLACE TABLE raw_data AS {source}")
+    row_count = con.execute("SELECT count(*) FROM raw_data").fetchone()[0]
+    print(f"Loaded {row_count} rows into DuckDB.")
+    return row_count
+
+# Function to split the columns of a relation into numeric and categorical columns
+def _column_kinds(con, relation: str):
+    all_columns, numeric_columns, categorical_columns = [], [], []
+    for name, column_type, *_ in con.execute(f"DESCRIBE {relation}").fetchall():
+        if name == "_source":
+            continue
+        all_columns.append(name)
+        if column_type.split("(")[0] in NUMERIC_TYPES:
+            numeric_columns.append(name)
+        elif column_type == "VARCHAR":
+            categorical_columns.append(name)
+    return all_columns, numeric_columns, categorical_columns
+
+# Function to compile the cleaning stage
+def clean_data_sql(con, relation: str = "raw_data"):
+    """
+    Compiles data_cleaning.clean_data into a query: numeric nulls are imputed with the column median, rows with
+    missing categorical values are dropped, rows with any |Z-score| >= 3 are removed, and the numeric columns
+    are standardized (identifier and label columns are only imputed). Statistics are computed at the same
+    points as in the pandas implementation.
+    
+    Parameters:
+    con (duckdb.DuckDBPyConnection): The DuckDB connection (used to inspect the schema).
+    relation (str): The table or subquery holding the raw data.
+    
+    Returns:
+    str: The SQL query producing the cleaned data.
+    """
+    all_columns, numeric_columns, categorical_columns = _column_kinds(con, relation)
+    column_types = {row[0]: row[1] for row in con.execute(f"DESCRIBE {relation}").fetchall()}
+    
+    # Handle missing values
+    medians = ", ".join(f"median({_quote(col)}) AS {_quote('median_' + col)}" for col in numeric_columns)
+    imputed_columns = [f"COALESCE(CAST({_quote(col)} AS DOUBLE), {_quote('median_' + col)}) AS {_quote(col)}"
+                       if col not in NON_FEATURE_COLUMNS else
+                       f"CAST(COALESCE({_quote(col)}, {_quote('median_' + col)}) AS {column_types[col]}) AS {_quote(col)}"
+                       for col in numeric_columns]
+    not_null = " AND ".join(f"{_quote(col)} IS NOT NULL" for col in categorical_columns) or "true"
+    passthrough = [_quote(col) for col in all_columns if col not in numeric_columns]
+    
+    # Remove outliers and standardize the feature columns, each using statistics of its own input
+    feature_columns = [col for col in numeric_columns if col not in NON_FEATURE_COLUMNS]
+    
+    def stats(prefix):
+        return ", ".join(f"avg({_quote(col)}) AS {_quote(prefix + 'mean_' + col)}, "
+                         f"stddev_samp({_quote(col)}) AS {_quote(prefix + 'std_' + col)}" for col in feature_columns) or "1"
+    
+    def zscore(prefix, col):
+        return f"(({_quote(col)} - {_quote(prefix + 'mean_' + col)}) / {_quote(prefix + 'std_' + col)})"
+    
+    outlier_filter = " AND ".join(f"abs({zscore('o_', col)}) < 3.0" for col in feature_columns) or "true"
+    standardized_columns = ([f"{zscore('s_', col)} AS {_quote(col)}" for col in feature_columns]
+                            + [_quote(col) for col in numeric_columns if col in NON_FEATURE_COLUMNS])
+    output_columns = ", ".join(_quote(col) for col in all_columns)
+    
+    if not numeric_columns:
+        return f"SELECT {output_columns} FROM {relation} WHERE {not_null}"
+    
+    return f"""
+        WITH medians AS (SELECT {medians} FROM {relation}),
+        imputed AS (
+            SELECT {', '.join(imputed_columns + passthrough)}
+            FROM {relation}, medians
+            WHERE {not_null}
+        ),
+        outlier_stats AS (SELECT {stats('o_')} FROM imputed),
+        filtered AS (
+            SELECT imputed.* FROM imputed, outlier_stats WHERE {outlier_filter}
+        ),
+        standard_stats AS (SELECT {stats('s_')} FROM filtered),
+        standardized AS (
+            SELECT {', '.join(standardized_columns + passthrough)}
+            FROM filtered, standard_stats
+        )
+        SELECT {output_columns} FROM standardized
+    """
+
+# Function to compile the feature engineering stage
+def engineer_features_sql(cleaned_sql: str):
+    """
+    Compiles feature_engineering.engineer_features into a query over the cleaned data: fuel efficiency per trip,
+    idle time per vehicle, and the high engine load and high-speed driving flags.
+    
+    Parameters:
+    cleaned_sql (str): The query producing the cleaned data.
+    
+    Returns:
+    str: The SQL query producing the engineered data.
+    """
+    # Division by zero yields +/-inf or NaN, as in pandas
+    fuel_efficiency = """
+        CASE WHEN fuel_consumed = 0 THEN
+            CASE WHEN distance_traveled > 0 THEN 'inf'::DOUBLE
+                 WHEN distance_traveled < 0 THEN '-inf'::DOUBLE
+                 ELSE 'nan'::DOUBLE END
+        ELSE distance_traveled / fuel_consumed END
+    """
+    return f"""
+        SELECT *,
+            {fuel_efficiency} AS fuel_efficiency_per_trip,
+            sum(CASE WHEN average_speed = 0 THEN 1 ELSE 0 END) OVER (PARTITION BY vehicle_id) AS idle_time,
+            CASE WHEN engine_load > 80 THEN 1 ELSE 0 END AS high_engine_load,
+            CASE WHEN average_speed > 80 THEN 1 ELSE 0 END AS high_speed_driving
+        FROM ({cleaned_sql})
+    """
+
+# Function to compile the dashboard export stage
+def prepare_export_sql(engineered_sql: str):
+    """
+    Compiles dashboard_export.prepare_data_for_export into a per-vehicle aggregation over the engineered data.
+    
+    Parameters:
+    engineered_sql (str): The query or table producing the engineered data.
+    
+    Returns:
+    str: The SQL query producing the dashboard export.
+    """
+    return f"""
+        SELECT vehicle_id,
+            avg(fuel_efficiency) AS fuel_efficiency,
+            sum(maintenance_required) AS maintenance_required,
+            avg(average_speed) AS average_speed,
+            avg(engine_load) AS engine_load,
+            sum(idle_time) AS idle_time
+        FROM ({engineered_sql})
+        GROUP BY vehicle_id
+        ORDER BY vehicle_id
+    """
+
+# Function to compile the per-vehicle feature store snapshot
+def feature_snapshot_sql(con, engineered_relation: str = "engineered_data"):
+    """
+    Compiles feature_store.build_feature_snapshot into a query: the features of each vehicle's most recent record,
+    the means of the rolling columns over its last FEATURE_ROLLING_WINDOW records, and its record count.
+    
+    Parameters:
+    con (duckdb.DuckDBPyConnection): The DuckDB connection (used to inspect the schema).
+    engineered_relation (str): The table holding the engineered data.
+    
+    Returns:
+    str: The SQL query producing one row per vehicle with the feature store columns.
+    """
+    columns = [row[0] for row in con.execute(f"DESCRIBE {engineered_relation}").fetchall()]
+    order_column = "timestamp" if "timestamp" in columns else ("date" if "date" in columns else None)
+    order = f"ORDER BY {_quote(order_column)}" if order_column else ""
+    latest_order = f"ORDER BY {_quote(order_column)} DESC" if order_column else ""
+    window = (f"(PARTITION BY vehicle_id {order} "
+              f"ROWS BETWEEN {int(feature_store.FEATURE_ROLLING_WINDOW) - 1} PRECEDING AND CURRENT ROW)")
+    
+    def column_or_null(col, expression=None):
+        return (expression or _quote(col)) if col in columns else "NULL"
+    
+    selected = [
+        "vehicle_id",
+        f"{column_or_null(order_column) if order_column else 'NULL'} AS last_timestamp",
+        *[f"{column_or_null(col)} AS {_quote(col)}" for col in feature_store.FEATURE_COLUMNS],
+        *[f"{column_or_null(col, f'avg({_quote(col)}) OVER {window}')} AS {_quote('rolling_' + col)}"
+          for col in feature_store.ROLLING_MEAN_COLUMNS],
+        f"{column_or_null('maintenance_required', f'sum(maintenance_required) OVER {window}')} AS rolling_maintenance_count",
+        "count(*) OVER (PARTITION BY vehicle_id) AS record_count",
+    ]
+    return f"""
+        SELECT * FROM (SELECT {', '.join(selected)},
+            row_number() OVER (PARTITION BY vehicle_id {latest_order}) AS _latest
+            FROM {engineered_relation})
+        WHERE _latest = 1
+    """
+
+# Function to write the result of a query to a CSV file
+def _copy_to_csv(con, query: str, file_path: str):
+    con.execute(f"COPY ({query}) TO {_literal(file_path)} (FORMAT CSV, HEADER)")
+
+# Main function to run the query pipeline
+def run_query_pipeline(processed_path: str = None, export_path: str = None):
+    """
+    Ingests the new CSV drops into the raw store, runs collection, cleaning and feature engineering as DuckDB
+    queries, writes the engineered data to processed_path and refreshes the feature store; when export_path is
+    given the dashboard export is written from the same plan.
+    
+    Parameters:
+    processed_path (str): Where to write the engineered data (defaults to PROCESSED_DATA_PATH).
+    export_path (str): Where to write the dashboard export, if at all.
+    
+    Returns:
+    int: The number of engineered rows written.
+    """
+    processed_path = processed_path or PROCESSED_DATA_PATH
+    data_collection.ingest_new_csv_files()
+    database_path = os.path.join(DUCKDB_TEMP_DIRECTORY, "pipeline.duckdb")
+    con = connect(database_path)
+    try:
+        if load_sources(con) == 0:
+            print("No data available for the query pipeline.")
+            return 0
+        
+        con.execute(f"CREATE OR REPLACE TABLE engineered_data AS {engineer_features_sql(clean_data_sql(con))}")
+        row_count = con.execute("SELECT count(*) FROM engineered_data").fetchone()[0]
+        _copy_to_csv(con, "SELECT * FROM engineered_data", processed_path)
+        print(f"Cleaning and feature engineering completed with DuckDB; {row_count} rows saved to {processed_path}.")
+        
+        if export_path:
+            _copy_to_csv(con, prepare_export_sql("SELECT * FROM engineered_data"), export_path)
+            print(f"Dashboard export written to {export_path}.")
+        
+        # Refresh the per-vehicle feature store from the same plan
+        snapshot = con.execute(feature_snapshot_sql(con)).df().drop(columns="_latest")
+        snapshot["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        updated = feature_store.upsert_features(snapshot[feature_store.STORE_COLUMNS])
+        print(f"Feature store updated for {updated} vehicles.")
+        return row_count
+    finally:
+        con.close()
+        for suffix in ("", ".wal"):
+            if os.path.exists(database_path + suffix):
+                os.remove(database_path + suffix)
+
+# Function to export the dashboard data from an engineered CSV file
+def export_dashboard_data(processed_path: str = None, export_path: str = None):
+    """
+    Aggregates an engineered CSV file for the dashboard with DuckDB, streaming the file instead of loading it.
+    
+    Parameters:
+    processed_path (str): The engineered data file (defaults to PROCESSED_DATA_PATH).
+    export_path (str): Where to write the dashboard export (defaults to EXPORT_FILE_PATH).
+    """
+    processed_path = processed_path or PROCESSED_DATA_PATH
+    export_path = export_path or EXPORT_FILE_PATH
+    con = connect(":memory:")
+    try:
+        _copy_to_csv(con, prepare_export_sql(f"SELECT * FROM read_csv({_literal(processed_path)}, header = true)"),
+                     export_path)
+        print(f"Data successfully exported to {export_path}.")
+    finally:
+        con.close()
@@ -0,0 +1,163 @@
+# synthetic_data.py
+# This script generates synthetic vehicle telematics data for testing and benchmarking the pipeline.
+# It writes a SQLite 'vehicle_performance' table and a folder of CSV drops with configurable fleet size,
+# history length, sampling rate, and missing-value, outlier and duplicate rates.
+
+import argparse
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+
+# Default location of the generated dataset
+OUTPUT_DIRECTORY = "C:/Users/Satej/Documents/Vehicle_Telematics/synthetic"
+
+# Sensor columns that may receive missing values and outliers (keys and the label are always complete)
+SENSOR_COLUMNS = ["distance_traveled", "fuel_consumed", "average_speed", "engine_load", "fuel_efficiency"]
+
+# Function to generate one day of telematics records
+def generate_day(rng: np.random.Generator, day: pd.Timestamp, vehicle_efficiency: np.ndarray, samples_per_day: int,
+                 missing_rate: float = 0.01, outlier_rate: float = 0.002, maintenance_rate: float = 0.03):
+    """
+    Generates the records of every vehicle for one day, sampled at a fixed rate.
+    
+    Parameters:
+    rng (np.random.Generator): The random number generator.
+    day (pd.Timestamp): The day to generate.
+    vehicle_efficiency (np.ndarray): The baseline fuel efficiency of each vehicle, indexed by vehicle_id - 1.
+    samples_per_day (int): The number of records per vehicle per day.
+    missing_rate (float): The fraction of sensor values replaced with missing values.
+    outlier_rate (float): The fraction of sensor values replaced with extreme values.
+    maintenance_rate (float): The approximate fraction of records flagged as requiring maintenance.
+    
+    Returns:
+    pd.DataFrame: The generated records.
+    """
+    num_vehicles = len(vehicle_efficiency)
+    n = num_vehicles * samples_per_day
+    vehicle_ids = np.repeat(np.arange(1, num_vehicles + 1), samples_per_day)
+    offsets = np.tile(np.arange(samples_per_day) * (86400 // samples_per_day), num_vehicles)
+    timestamps = (day + pd.to_timedelta(offsets, unit="s")).strftime("%Y-%m-%d %H:%M:%S")
+    interval_hours = 24.0 / samples_per_day
+    
+    # A share of the samples are spent idling
+    idle = rng.random(n) < 0.15
+    average_speed = np.where(idle, 0.0, rng.gamma(6, 8, n).clip(5, 110))
+    engine_load = (20 + average_speed * 0.55 + rng.normal(0, 8, n)).clip(5, 100)
+    fuel_efficiency = (vehicle_efficiency[vehicle_ids - 1] - (engine_load - 50) * 0.08 + rng.normal(0, 1.5, n)).clip(5, 60)
+    distance_traveled = average_speed * interval_hours
+    fuel_consumed = np.where(idle, 0.2 * interval_hours, distance_traveled / fuel_efficiency)
+    
+    # Maintenance is rare and more likely under heavy engine load
+    maintenance_probability = maintenance_rate * np.exp((engine_load - 50) / 20)
+    maintenance_required = (rng.random(n) < maintenance_probability.clip(0, 1)).astype(int)
+    
+    data = pd.DataFrame({
+        "vehicle_id": vehicle_ids,
+        "date": day.strftime("%Y-%m-%d"),
+        "timestamp": timestamps,
+        "distance_traveled": distance_traveled.round(3),
+        "fuel_consumed": fuel_consumed.round(4),
+        "average_speed": average_speed.round(2),
+        "engine_load": engine_load.round(2),
+        "fuel_efficiency": fuel_efficiency.round(2),
+        "maintenance_required": maintenance_required,
+    })
+    
+    # Inject outliers, then missing values, into the sensor columns
+    for col in SENSOR_COLUMNS:
+        outliers = rng.random(n) < outlier_rate
+        data.loc[outliers, col] = data.loc[outliers, col] * rng.uniform(20, 50, outliers.sum())
+        missing = rng.random(n) < missing_rate
+        data.loc[missing, col] = np.nan
+    return data
+
+# Main function to write a synthetic dataset
+def generate_fleet_dataset(output_dir: str = None, num_vehicles: int = 100, num_days: int = 30,
+                           samples_per_day: int = 24, missing_rate: float = 0.01, outlier_rate: float = 0.002,
+                           maintenance_rate: float = 0.03, csv_fraction: float = 0.3, duplicate_rate: float = 0.01,
+                           compress_csv: bool = False, start_date: str = "2023-01-01", seed: int = 42):
+    """
+    Generates a synthetic fleet history one day at a time and writes it to a SQLite database and a CSV drop folder.
+    The last csv_fraction of the days are written as one CSV file per day instead of to the database, and a
+    duplicate_rate share of the database rows is repeated in the CSV files to exercise deduplication.
+    
+    Parameters:
+    output_dir (str): The directory to write to (defaults to OUTPUT_DIRECTORY).
+    num_vehicles (int): The number of vehicles in the fleet.
+    num_days (int): The number of days of history.
+    samples_per_day (int): The number of records per vehicle per day.
+    missing_rate (float): The fraction of sensor values that are missing.
+    outlier_rate (float): The fraction of sensor values that are extreme outliers.
+    maintenance_rate (float): The approximate fraction of records requiring maintenance.
+    csv_fraction (float): The fraction of days delivered as CSV drops.
+    duplicate_rate (float): The fraction of database rows re-uploaded in the CSV drops.
+    compress_csv (bool): Whether to gzip the CSV drops.
+    start_date (str): The first day of the history.
+    seed (int): The random seed.
+    
+    Returns:
+    dict: The paths of the database and CSV drop directory, and the number of rows written to each.
+    """
+    output_dir = output_dir or OUTPUT_DIRECTORY
+    db_path = os.path.join(output_dir, "vehicle_data.db")
+    csv_dir = os.path.join(output_dir, "csv_drops")
+    os.makedirs(csv_dir, exist_ok=True)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    
+    rng = np.random.default_rng(seed)
+    
+    # Each vehicle keeps the same baseline efficiency for the whole history
+    vehicle_efficiency = rng.normal(25, 4, num_vehicles).clip(8, 45)
+    
+    days = pd.date_range(start_date, periods=num_days, freq="D")
+    num_sql_days = num_days - int(round(num_days * csv_fraction))
+    num_csv_days = num_days - num_sql_days
+    sql_rows, csv_rows = 0, 0
+    duplicate_pool = []
+    
+    conn = sqlite3.connect(db_path)
+    try:
+        for i, day in enumerate(days):
+            data = generate_day(rng, day, vehicle_efficiency, samples_per_day, missing_rate, outlier_rate, maintenance_rate)
+            if i < num_sql_days:
+                data.to_sql("vehicle_performance", conn, if_exists="append", index=False)
+                sql_rows += len(data)
+                if duplicate_rate > 0:
+                    duplicate_pool.append(data.sample(frac=duplicate_rate, random_state=rng))
+                continue
+            
+            # Re-upload an equal share of the sampled database rows alongside each CSV drop
+            if duplicate_pool:
+                share = len(duplicate_pool) // num_csv_days + 1
+                data = pd.concat([data] + duplicate_pool[:share], ignore_index=True)
+                duplicate_pool = duplicate_pool[share:]
+            file_name = f"telematics_{day.strftime('%Y%m%d')}.csv" + (".gz" if compress_csv else "")
+            data.to_csv(os.path.join(csv_dir, file_name), index=False)
+            csv_rows += len(data)
+        conn.commit()
+    finally:
+        conn.close()
+    
+    print(f"Synthetic dataset written to {output_dir}: {sql_rows} SQL rows, {csv_rows} CSV rows.")
+    return {"db_path": db_path, "csv_dir": csv_dir, "sql_rows": sql_rows, "csv_rows": csv_rows}
+
+# Example usage of the function
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic vehicle telematics dataset.")
+    parser.add_argument("--output-dir", default=OUTPUT_DIRECTORY)
+    parser.add_argument("--vehicles", type=int, default=100)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--samples-per-day", type=int, default=24)
+    parser.add_argument("--missing-rate", type=float, default=0.01)
+    parser.add_argument("--outlier-rate", type=float, default=0.002)
+    parser.add_argument("--csv-fraction", type=float, default=0.3)
+    parser.add_argument("--duplicate-rate", type=float, default=0.01)
+    parser.add_argument("--compress", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    generate_fleet_dataset(args.output_dir, args.vehicles, args.days, args.samples_per_day, args.missing_rate,
+                           args.outlier_rate, csv_fraction=args.csv_fraction, duplicate_rate=args.duplicate_rate,
+                           compress_csv=args.compress, seed=args.seed)